@@ -53,6 +53,6 @@ GERMAN_NAMES = [
 ]
 
 
-def generate_kick_name(existing_names):
+def generate_kick_name(existing_names: set[str]):
     available = [f"AI: {n}" for n in GERMAN_NAMES if f"AI: {n}" not in existing_names]
     return random.choice(available)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-15 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kickgen', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatedkick',
+            index=models.Index(fields=['user', 'name'], name='kickgen_user_name_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-15 12:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kickgen', '0002_generatedkick_kickgen_user_name_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatedkick',
+            index=models.Index(fields=['user', 'created_at'], name='kick_user_created_idx'),
+        ),
+    ]
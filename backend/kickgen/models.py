@@ -14,3 +14,7 @@ class GeneratedKick(models.Model):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["user", "name"], name="kickgen_user_name_idx"),
+            models.Index(fields=["user", "created_at"], name="kick_user_created_idx"),
+        ]
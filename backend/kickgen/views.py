@@ -1,7 +1,9 @@
 import uuid
-from datetime import datetime, time
 
+from django.db.models import Count, Max, Q
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -16,27 +18,48 @@ TOTAL_GEN_CAP = 30
 GLOBAL_DAILY_GEN_BUDGET = 1000
 EST_OFFSET = timezone.timedelta(hours=-5)
 
+_supabase_client = None
 
-def get_midnight_est():
-    now_est = timezone.now() + EST_OFFSET
-    midnight_est = datetime.combine(now_est.date(), time.min, tzinfo=now_est.tzinfo)
-    return midnight_est - EST_OFFSET
+
+def get_supabase():
+    # build once per process so requests reuse the client's connection pool
+    global _supabase_client
+    if _supabase_client is None:
+        from supabase import create_client
+        _supabase_client = create_client(
+            settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY
+        )
+    return _supabase_client
+
+
+def get_today_est():
+    # created_at is a DateField, so compare against the EST calendar date directly
+    return (timezone.now() + EST_OFFSET).date()
 
 
 def get_global_gens_today():
-    today_midnight = get_midnight_est()
-    return GeneratedKick.objects.filter(created_at__gte=today_midnight).count()
+    return GeneratedKick.objects.filter(created_at__gte=get_today_est()).count()
 
 
 def get_user_counts(user):
     gens_total = GeneratedKick.objects.filter(user=user).count()
-    today_midnight = get_midnight_est()
     gens_today = GeneratedKick.objects.filter(
-        user=user, created_at__gte=today_midnight
+        user=user, created_at__gte=get_today_est()
     ).count()
     return gens_total, gens_today
 
 
+def kick_list_etag(request, *args, **kwargs):
+    # one aggregate covering everything KickListView returns: the kick set
+    # (count + newest id) and today's count, which changes at midnight EST
+    agg = GeneratedKick.objects.filter(user=request.user).aggregate(
+        total=Count("id"),
+        today=Count("id", filter=Q(created_at__gte=get_today_est())),
+        last=Max("id"),
+    )
+    return f"kicks-{request.user.id}-{agg['total']}-{agg['today']}-{agg['last']}"
+
+
 class GenerateKickView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -63,23 +86,22 @@ class GenerateKickView(APIView):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        # call modal worker
-        import modal
-        KickGenerator = modal.Cls.from_name("kick-generator-app", "KickGenerator")
-        wav_bytes = KickGenerator().generate_kick.remote("hit house")
-
-        # Upload to Supabase Storage
-        from supabase import create_client
+        # Signed upload URL so the modal worker writes straight to Supabase Storage
         file_id = str(uuid.uuid4())
         storage_path = f"{request.user.id}/{file_id}.wav"
-        sb = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-        sb.storage.from_("generated-kicks").upload(
-            storage_path, wav_bytes, {"content-type": "audio/wav"}
+        signed = get_supabase().storage.from_("generated-kicks").create_signed_upload_url(
+            storage_path
         )
         audio_url = f"{settings.SUPABASE_URL}/storage/v1/object/public/generated-kicks/{storage_path}"
 
+        # call modal worker (generates and uploads the wav); returns once the
+        # file is in storage, so we never save a record without its file
+        import modal
+        KickGenerator = modal.Cls.from_name("kick-generator-app", "KickGenerator")
+        KickGenerator().generate_kick_to_url.remote("hit house", signed["signed_url"])
+
         # get german file name
-        existing_names = list(
+        existing_names = set(
             GeneratedKick.objects.filter(user=request.user).values_list(
                 "name", flat=True
             )
@@ -112,8 +134,12 @@ class GenerateKickView(APIView):
 class KickListView(APIView):
     permission_classes = [IsAuthenticated]
 
+    # ETag / If-None-Match: unchanged lists get a bodyless 304
+    @method_decorator(condition(etag_func=kick_list_etag))
     def get(self, request):
-        kicks = GeneratedKick.objects.filter(user=request.user)
+        kicks = GeneratedKick.objects.filter(user=request.user).only(
+            "id", "name", "audio_url"
+        )
         gens_total, gens_today = get_user_counts(request.user)
 
         return Response(
@@ -132,41 +158,46 @@ class KickDeleteView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, pk):
-        kick = GeneratedKick.objects.filter(id=pk, user=request.user).first()
+        # One query for all of the user's kicks (at most TOTAL_GEN_CAP rows):
+        # finds the target and gives the remaining count without a count()
+        user_kicks = list(
+            GeneratedKick.objects.filter(user=request.user)
+            .order_by()
+            .values_list("id", "name", "storage_path")
+        )
+        kick = next((k for k in user_kicks if k[0] == pk), None)
         if not kick:
             return Response(
                 {"error": "Kick not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Check if any presets reference this kick
+        _, kick_name, storage_path = kick
+
+        # Check if any presets reference this kick (single query for names)
         affected_presets = Preset.objects.filter(
-            user=request.user, kick_sample=kick.name
+            user=request.user, kick_sample=kick_name
         )
+        affected_names = list(affected_presets.values_list("preset_name", flat=True))
 
-        if affected_presets.exists() and request.query_params.get("confirm") != "true":
+        if affected_names and request.query_params.get("confirm") != "true":
             return Response(
                 {
                     "error": "Presets will be deleted",
-                    "presets": list(
-                        affected_presets.values_list("preset_name", flat=True)
-                    ),
+                    "presets": affected_names,
                 },
                 status=status.HTTP_409_CONFLICT,
             )
 
         # Delete from Supabase Storage
-        from supabase import create_client
-        sb = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-        sb.storage.from_("generated-kicks").remove([kick.storage_path])
+        get_supabase().storage.from_("generated-kicks").remove([storage_path])
 
         # Delete affected presets and the kick
-        affected_presets.delete()
-        kick.delete()
-
-        gens_total = GeneratedKick.objects.filter(user=request.user).count()
+        if affected_names:
+            affected_presets.delete()
+        GeneratedKick.objects.filter(id=pk).delete()
 
         return Response(
-            {"total_count": gens_total},
+            {"total_count": len(user_kicks) - 1},
             status=status.HTTP_200_OK,
         )
@@ -4,7 +4,27 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .models import Preset
 from .serializers import PresetSerializer
-from django.db.models import Q
+from django.db.models import Count, Max, Q
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+
+def visible_presets(request):
+    # For authenticated users: return user presets + shared presets
+    # For guests: return only shared presets
+    if request.user.is_authenticated:
+        return Preset.objects.filter(
+            Q(user=request.user) | Q(is_shared=True)  # query user and shared presets
+        )
+    return Preset.objects.filter(is_shared=True)  # only shared presets for guests
+
+
+def preset_list_etag(request, *args, **kwargs):
+    # count + newest updated_at changes on any create, update or delete
+    agg = visible_presets(request).aggregate(count=Count("id"), updated=Max("updated_at"))
+    user_id = request.user.id if request.user.is_authenticated else "guest"
+    updated = agg["updated"].timestamp() if agg["updated"] else 0
+    return f"presets-{user_id}-{agg['count']}-{updated}"
 
 
 class PresetListCreateView(APIView):
@@ -16,15 +36,10 @@ class PresetListCreateView(APIView):
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    # ETag / If-None-Match: unchanged lists get a bodyless 304
+    @method_decorator(condition(etag_func=preset_list_etag))
     def get(self, request):
-        # For authenticated users: return user presets + shared presets
-        # For guests: return only shared presets
-        if request.user.is_authenticated:
-            presets = Preset.objects.filter(
-                Q(user=request.user) | Q(is_shared=True)  # query user and shared presets
-            )
-        else:
-            presets = Preset.objects.filter(is_shared=True)  # only shared presets for guests
+        presets = visible_presets(request)
         serializer = PresetSerializer(presets, many=True)  # put into json
         return Response(serializer.data, status=status.HTTP_200_OK)  # send it
 
@@ -11,22 +11,23 @@ Usage:
 """
 
 import argparse
-import csv
-import random
-import string
-import sys
+import pathlib
+import re
+import secrets
+import wave
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, BinaryIO, Callable
 
-import numpy as np
 import torch
 import torch.nn.functional as F
 import torchaudio
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from models.autoencoder import KickVAE
 from models.diffusion import LatentUNet, NoiseScheduler
+from models.precision import native_bf16
 from models.text_encoder import KeywordEncoder
+from training.config import AutoencoderConfig, DiffusionConfig
 
 # Audio params (must match preprocess.py)
 SAMPLE_RATE = 44100
@@ -36,6 +37,25 @@ N_MELS = 128
 DURATION_SECONDS = 2.0
 TARGET_SAMPLES = int(SAMPLE_RATE * DURATION_SECONDS)
 
+# Loaded checkpoints keyed by (path, device), reused across generate() calls
+_MODEL_CACHE: dict[tuple[str, str, str], Any] = {}
+
+# Griffin-Lim fallback state keyed by (sr, n_fft, n_mels); built on first use
+_MEL_PINV_CACHE: dict[tuple[int, int, int], torch.Tensor] = {}
+_GL_CACHE: dict[tuple[int, int, int], torchaudio.transforms.GriffinLim] = {}
+
+# Output fade: exponential fade-out from FADE_START to FADE_END, silence after
+FADE_START = int(1.0 * SAMPLE_RATE)
+FADE_END = int(1.75 * SAMPLE_RATE)
+_FADE_CACHE: dict[torch.device, torch.Tensor] = {}
+
+# Prompt separators: whitespace and commas
+_SPLIT_RE = re.compile(r"[\s,]+")
+
+# Vocoder checkpoints in preference order: the generator-only export (no
+# discriminator/optimizer state), then the full training checkpoint
+VOCODER_CHECKPOINTS = ("weights/vocoder.pt", "weights/vocoder_epoch_50.pt")
+
 
 # ---------------------------------------------------------------------------
 # DDIM Sampler
@@ -51,6 +71,7 @@ class DDIMSampler:
         total = scheduler.timesteps
         step_size = total // num_steps
         self.timesteps = list(range(total - 1, -1, -step_size))[:num_steps]
+        self.timesteps_tensor = torch.tensor(self.timesteps, dtype=torch.long)
 
     @torch.no_grad()
     def sample(
@@ -78,32 +99,47 @@ class DDIMSampler:
         x = torch.randn(shape, device=device)
         alpha_bars = self.scheduler.alpha_bars.to(device)
 
-        for i, t in enumerate(self.timesteps):
-            t_batch = torch.full((shape[0],), t, device=device, dtype=torch.long)
-
-            # Classifier-free guidance
-            if uncond is not None and cfg_scale > 1.0:
-                noise_cond = model(x, t_batch, cond)
-                noise_uncond = model(x, t_batch, uncond)
-                noise_pred = noise_uncond + cfg_scale * (noise_cond - noise_uncond)
-            else:
-                noise_pred = model(x, t_batch, cond)
-
-            # DDIM update
-            alpha_bar_t = alpha_bars[t]
-            # Previous alpha_bar
-            if i + 1 < len(self.timesteps):
-                t_prev = self.timesteps[i + 1]
-                alpha_bar_prev = alpha_bars[t_prev]
-            else:
-                alpha_bar_prev = torch.tensor(1.0, device=device)
-
-            # Predicted x_0
-            x0_pred = (x - (1 - alpha_bar_t).sqrt() * noise_pred) / alpha_bar_t.sqrt()
-            # Direction pointing to x_t
-            dir_xt = (1 - alpha_bar_prev).sqrt() * noise_pred
+        # Per-step DDIM coefficients, computed once instead of inside the loop.
+        # The eta=0 update
+        #   x0   = (x - sqrt(1 - ab) * eps) / sqrt(ab)
+        #   x' = sqrt(ab_prev) * x0 + sqrt(1 - ab_prev) * eps
+        # collapses to x' = a * x + b * eps.
+        ts = self.timesteps_tensor.to(device)
+        ab = alpha_bars[ts]
+        ab_prev = torch.cat([ab[1:], ab.new_ones(1)])
+        coef_x = ab_prev.sqrt() / ab.sqrt()
+        coef_eps = (1 - ab_prev).sqrt() - coef_x * (1 - ab).sqrt()
+
+        # Classifier-free guidance: cond and uncond share one batched forward
+        use_cfg = uncond is not None and cfg_scale > 1.0
+        if use_cfg:
+            c_in = torch.cat([cond, uncond], dim=0)
+
+        # Timestep batch, filled in place each step
+        t_buf = torch.empty(
+            2 * shape[0] if use_cfg else shape[0], device=device, dtype=torch.long
+        )
+
+        # fp16 U-Net forwards on GPU; x and the DDIM update stay in fp32
+        amp_enabled = device.type in ("cuda", "mps")
+
+        for i in range(len(ts)):
+            # 0-dim device tensor: the fill stays on device, no host scalar
+            t_buf.fill_(ts[i])
+
+            with torch.autocast(
+                device_type=device.type, dtype=torch.float16, enabled=amp_enabled,
+            ):
+                if use_cfg:
+                    x_in = torch.cat([x, x], dim=0)
+                    noise_cond, noise_uncond = model(x_in, t_buf, c_in).chunk(2, dim=0)
+                    # In place on the model output: uncond + scale * (cond - uncond)
+                    noise_pred = noise_cond.sub_(noise_uncond).mul_(cfg_scale).add_(noise_uncond)
+                else:
+                    noise_pred = model(x, t_buf, cond)
+
             # DDIM step (eta=0, deterministic)
-            x = alpha_bar_prev.sqrt() * x0_pred + dir_xt
+            x.mul_(coef_x[i]).add_(noise_pred.mul_(coef_eps[i]))
 
         return x
 
@@ -133,50 +169,219 @@ def griffin_lim_synthesis(mel: torch.Tensor, sr: int = SAMPLE_RATE) -> torch.Ten
     Returns:
         (1, samples) waveform tensor.
     """
-    mel_basis = torchaudio.functional.melscale_fbanks(
-        n_freqs=N_FFT // 2 + 1,
-        f_min=0.0,
-        f_max=sr / 2.0,
-        n_mels=N_MELS,
-        sample_rate=sr,
-    )  # (n_freqs, n_mels)
-
-    # Pseudo-inverse to go from mel -> linear spectrogram
-    mel_basis_pinv = torch.linalg.pinv(mel_basis.T).to(mel.device)  # (n_freqs, n_mels)
-
-    # mel: (1, n_mels, T) -> (1, T, n_mels)
-    mel_t = mel.squeeze(0).T  # (T, n_mels)
-    linear = (mel_basis_pinv @ mel_t.T).clamp(min=0)  # (n_freqs, T)
-    linear = linear.unsqueeze(0)  # (1, n_freqs, T)
+    key = (sr, N_FFT, N_MELS)
+    mel_basis_pinv = _MEL_PINV_CACHE.get(key)
+    if mel_basis_pinv is None:
+        mel_basis = torchaudio.functional.melscale_fbanks(
+            n_freqs=N_FFT // 2 + 1,
+            f_min=0.0,
+            f_max=sr / 2.0,
+            n_mels=N_MELS,
+            sample_rate=sr,
+        )  # (n_freqs, n_mels)
+        # Pseudo-inverse to go from mel -> linear spectrogram
+        mel_basis_pinv = torch.linalg.pinv(mel_basis.T)  # (n_freqs, n_mels)
+        _MEL_PINV_CACHE[key] = mel_basis_pinv
+    mel_basis_pinv = mel_basis_pinv.to(mel.device)
+
+    # (n_freqs, n_mels) x (1, n_mels, T) -> (1, n_freqs, T); the pinv can go
+    # slightly negative, so clamp to a valid magnitude
+    linear = torch.einsum("fm,bmt->bft", mel_basis_pinv, mel).clamp_(min=0)
 
     # Griffin-Lim (runs on CPU)
     linear = linear.cpu()
-    gl = torchaudio.transforms.GriffinLim(
-        n_fft=N_FFT,
-        hop_length=HOP_LENGTH,
-        power=1.0,
-        n_iter=64,
-    )
+    gl = _GL_CACHE.get(key)
+    if gl is None:
+        gl = torchaudio.transforms.GriffinLim(
+            n_fft=N_FFT,
+            hop_length=HOP_LENGTH,
+            power=1.0,
+            n_iter=64,
+        ).eval()
+        _GL_CACHE[key] = gl
     waveform = gl(linear)
     return waveform
 
 
+# ---------------------------------------------------------------------------
+# WAV output
+# ---------------------------------------------------------------------------
+
+def apply_fade_out(waveform: torch.Tensor) -> torch.Tensor:
+    """Exponential fade-out (1.0s–1.75s) + silent tail (1.75s–2.0s), in place.
+
+    Exponential curve (power=3) drops fast then tapers, keeping OTT from
+    re-amplifying the tail. 0.25s of hard silence lets OTT fully release.
+    Expects a waveform already trimmed/padded to TARGET_SAMPLES.
+    """
+    fade = _FADE_CACHE.get(waveform.device)
+    if fade is None:
+        fade = (torch.linspace(1.0, 0.0, FADE_END - FADE_START) ** 3).to(waveform.device)
+        _FADE_CACHE[waveform.device] = fade
+    waveform[..., FADE_START:FADE_END].mul_(fade)
+    waveform[..., FADE_END:].zero_()
+    return waveform
+
+
+def normalize_peak(waveform: torch.Tensor, peak: float = 0.95) -> torch.Tensor:
+    """Scale a waveform in place so its absolute peak is ``peak``.
+
+    Branch-free (silence stays silence), so a GPU waveform is not synced to
+    the host before the final PCM copy.
+    """
+    return waveform.mul_(peak / waveform.abs().max().clamp_(min=1e-8))
+
+
+def write_wav_int16(
+    dest: Path | BinaryIO, waveform: torch.Tensor, sr: int = SAMPLE_RATE,
+) -> None:
+    """Write a mono waveform in [-1, 1] as 16-bit PCM WAV.
+
+    Uses the stdlib ``wave`` module (avoids the torchcodec dependency of
+    ``torchaudio.save``). ``dest`` may be a path or a writable binary buffer.
+    """
+    pcm = (waveform.detach().clamp(-1.0, 1.0) * 32767).to(torch.int16).cpu()
+    with wave.open(str(dest) if isinstance(dest, Path) else dest, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(pcm.reshape(-1).numpy().tobytes())
+
+
 # ---------------------------------------------------------------------------
 # Prompt parsing
 # ---------------------------------------------------------------------------
 
-def parse_prompt(prompt: str, vocab: list[str]) -> list[int]:
+def parse_prompt(prompt: str, kw_to_idx: dict[str, int]) -> list[int]:
     """Convert a text prompt into keyword token IDs.
 
-    Splits on spaces and commas, matches against vocab.
+    Splits on spaces and commas, matches against the keyword -> index map
+    built once per checkpoint (see ``build_kw_to_idx``).
+    """
+    return [kw_to_idx[w] for w in _SPLIT_RE.split(prompt.lower()) if w in kw_to_idx]
+
+
+def build_kw_to_idx(vocab: list[str]) -> dict[str, int]:
+    """Map each vocab keyword to its token index."""
+    return {kw: i for i, kw in enumerate(vocab)}
+
+
+# ---------------------------------------------------------------------------
+# Model loading
+# ---------------------------------------------------------------------------
+
+def _get_or_load(
+    path: Path, device: torch.device, builder: Callable[[], Any], variant: str = "",
+) -> Any:
+    """Return the cached object for (path, device, variant), building it on first use."""
+    key = (str(path), str(device), variant)
+    obj = _MODEL_CACHE.get(key)
+    if obj is None:
+        obj = builder()
+        _MODEL_CACHE[key] = obj
+    return obj
+
+
+# Older checkpoints pickled the config dataclass (with Path fields); allowing
+# exactly these classes lets them load with the tensors-only unpickler too.
+# Paths are also listed under their pre-3.13 "pathlib" names, which is what
+# pickles written on older Pythons reference
+torch.serialization.add_safe_globals([
+    AutoencoderConfig,
+    DiffusionConfig,
+    pathlib.PosixPath,
+    pathlib.WindowsPath,
+    (pathlib.PosixPath, "pathlib.PosixPath"),
+    (pathlib.WindowsPath, "pathlib.WindowsPath"),
+])
+
+
+def load_checkpoint(path: Path | str, device: torch.device) -> dict[str, Any]:
+    """Load a checkpoint with the tensors-only unpickler, memory-mapped.
+
+    There is no full-unpickle fallback: a checkpoint holding any other
+    pickled object fails to load. Checkpoints store their config as a plain
+    dict, exposed here as an attribute namespace (``ckpt["config"].latent_dim``);
+    older ones load their config as the dataclass, which reads the same way.
+    """
+    ckpt = torch.load(path, map_location=device, weights_only=True, mmap=True)
+    if isinstance(ckpt.get("config"), dict):
+        ckpt["config"] = SimpleNamespace(**ckpt["config"])
+    return ckpt
+
+
+def _maybe_compile(module: torch.nn.Module, device: torch.device) -> torch.nn.Module:
+    """torch.compile for the static-shape inference path (CUDA only)."""
+    if device.type != "cuda":
+        return module
+    return torch.compile(module, mode="reduce-overhead", fullgraph=False, dynamic=False)
+
+
+def load_diffusion(
+    path: Path, device: torch.device,
+) -> tuple[LatentUNet, KeywordEncoder, NoiseScheduler, list[str], dict[str, int], Any]:
+    """Load (model, text_enc, scheduler, vocab, kw_to_idx, config) from a diffusion checkpoint."""
+    print("Loading diffusion model...")
+    diff_ckpt = load_checkpoint(path, device)
+    vocab = diff_ckpt["vocab"]
+    cfg = diff_ckpt["config"]
+
+    model = LatentUNet(
+        latent_dim=cfg.latent_dim,
+        base_channels=cfg.base_channels,
+        cond_dim=cfg.cond_dim,
+    ).to(device)
+    # Use EMA weights for better quality
+    model.load_state_dict(diff_ckpt["ema_state_dict"])
+    model.eval()
+    model = _maybe_compile(model, device)
+
+    text_enc = KeywordEncoder(
+        vocab_size=len(vocab),
+        embed_dim=cfg.text_embed_dim,
+        cond_dim=cfg.cond_dim,
+    ).to(device)
+    text_enc.load_state_dict(diff_ckpt["text_enc_state_dict"])
+    text_enc.eval()
+
+    scheduler = NoiseScheduler(cfg.timesteps, cfg.beta_start, cfg.beta_end).to(device)
+    return model, text_enc, scheduler, vocab, build_kw_to_idx(vocab), cfg
+
+
+def load_vae(path: Path, device: torch.device, latent_dim: int) -> KickVAE:
+    """Load the VAE from a checkpoint in eval mode."""
+    print("Loading VAE...")
+    vae_ckpt = load_checkpoint(path, device)
+    vae = KickVAE(latent_dim=latent_dim).to(device)
+    vae.load_state_dict(vae_ckpt["model_state_dict"])
+    vae.eval()
+    # Inference only calls decode(), so compile the decoder submodule
+    vae.decoder = _maybe_compile(vae.decoder, device)
+    return vae
+
+
+def load_vocoder(path: Path, device: torch.device, int8: bool = False) -> torch.nn.Module:
+    """Load the vocoder generator, frozen with weight norm folded in, for inference.
+
+    With ``int8``, the larger convs are swapped for int8 weight-only versions.
     """
-    kw_to_idx = {kw: i for i, kw in enumerate(vocab)}
-    tokens = []
-    for word in prompt.replace(",", " ").lower().split():
-        word = word.strip()
-        if word in kw_to_idx:
-            tokens.append(kw_to_idx[word])
-    return tokens
+    print("Loading vocoder...")
+    from models.vocoder import GENERATORS, freeze_for_inference
+    voc_ckpt = load_checkpoint(path, device)
+    # Older checkpoints carry no generator_type / generator_kwargs
+    vocoder = GENERATORS[voc_ckpt.get("generator_type", "hifigan")](
+        in_channels=N_MELS, **voc_ckpt.get("generator_kwargs", {}),
+    ).to(device)
+    # Training checkpoints store "generator"; the generator-only vocoder.pt
+    # written at the end of training stores "generator_state_dict"
+    key = "generator" if "generator" in voc_ckpt else "generator_state_dict"
+    vocoder.load_state_dict(voc_ckpt[key])
+    # Weights pre-cast to the bf16 autocast dtype generate() runs it under
+    freeze_for_inference(vocoder, torch.bfloat16 if native_bf16(device) else None)
+    if int8:
+        from models.vocoder import quantize_
+        quantize_(vocoder)
+    return _maybe_compile(vocoder, device)
 
 
 # ---------------------------------------------------------------------------
@@ -192,6 +397,7 @@ def generate(
     ddim_steps: int = 50,
     output_path: Path | None = None,
     seed: int | None = None,
+    int8_vocoder: bool = False,
 ) -> Path:
     """Run the full generation pipeline.
 
@@ -204,6 +410,7 @@ def generate(
         ddim_steps: Number of DDIM sampling steps.
         output_path: Output WAV path. If None, auto-generates in generations/ folder.
         seed: Random seed for reproducibility.
+        int8_vocoder: Run the vocoder with int8 weight-only quantized convs.
 
     Returns:
         Path to the generated WAV file.
@@ -218,33 +425,14 @@ def generate(
     if seed is not None:
         torch.manual_seed(seed)
 
-    # --- Load diffusion checkpoint ---
-    print("Loading diffusion model...")
-    diff_ckpt = torch.load(diffusion_checkpoint, weights_only=False, map_location=device)
-    vocab = diff_ckpt["vocab"]
-    cfg = diff_ckpt["config"]
-
-    model = LatentUNet(
-        latent_dim=cfg.latent_dim,
-        base_channels=cfg.base_channels,
-        cond_dim=cfg.cond_dim,
-    ).to(device)
-    # Use EMA weights for better quality
-    model.load_state_dict(diff_ckpt["ema_state_dict"])
-    model.eval()
-
-    text_enc = KeywordEncoder(
-        vocab_size=len(vocab),
-        embed_dim=cfg.text_embed_dim,
-        cond_dim=cfg.cond_dim,
-    ).to(device)
-    text_enc.load_state_dict(diff_ckpt["text_enc_state_dict"])
-    text_enc.eval()
-
-    scheduler = NoiseScheduler(cfg.timesteps, cfg.beta_start, cfg.beta_end).to(device)
+    # --- Load diffusion checkpoint (cached across calls) ---
+    model, text_enc, scheduler, vocab, kw_to_idx, cfg = _get_or_load(
+        diffusion_checkpoint, device,
+        lambda: load_diffusion(diffusion_checkpoint, device),
+    )
 
     # --- Encode prompt ---
-    token_ids = parse_prompt(prompt, vocab) if prompt else []
+    token_ids = parse_prompt(prompt, kw_to_idx) if prompt else []
     if token_ids:
         matched = [vocab[i] for i in token_ids]
         print(f"Prompt keywords matched: {matched}")
@@ -257,8 +445,9 @@ def generate(
         name_parts = ["kick"] + matched + [generate_hash()]
         output_path = Path(f"generations/{'_'.join(name_parts)}.wav")
 
-    cond = text_enc([token_ids], device)
-    uncond = text_enc([[]], device)  # null embedding for CFG
+    # Prompt and null (CFG) embeddings in one encoder call
+    with torch.no_grad():
+        cond, uncond = text_enc([token_ids, []], device).chunk(2, dim=0)
 
     # --- DDIM sampling ---
     print(f"Sampling with DDIM ({ddim_steps} steps, cfg_scale={cfg_scale})...")
@@ -274,13 +463,18 @@ def generate(
 
     # --- VAE decode ---
     print("Decoding latent with VAE...")
-    vae_ckpt = torch.load(vae_checkpoint, weights_only=False, map_location=device)
-    vae = KickVAE(latent_dim=cfg.latent_dim).to(device)
-    vae.load_state_dict(vae_ckpt["model_state_dict"])
-    vae.eval()
+    vae = _get_or_load(
+        vae_checkpoint, device,
+        lambda: load_vae(vae_checkpoint, device, cfg.latent_dim),
+    )
 
-    with torch.no_grad():
+    with torch.no_grad(), torch.autocast(
+        device_type=device.type,
+        dtype=torch.float16,
+        enabled=device.type in ("cuda", "mps"),
+    ):
         log_mel = vae.decode(latent)  # (1, 1, 128, 173)
+    log_mel = log_mel.float()
 
     # --- Vocoder ---
     # Squeeze for processing: (1, 128, 173)
@@ -288,14 +482,15 @@ def generate(
 
     if vocoder_checkpoint is not None and vocoder_checkpoint.exists():
         print("Synthesizing waveform with HiFi-GAN vocoder...")
-        from models.vocoder import HiFiGANGenerator
-        vocoder = HiFiGANGenerator(in_channels=N_MELS).to(device)
-        voc_ckpt = torch.load(vocoder_checkpoint, weights_only=False, map_location=device)
-        vocoder.load_state_dict(voc_ckpt["generator"])
-        vocoder.eval()
-        vocoder.remove_weight_norm()
-
-        with torch.no_grad():
+        vocoder = _get_or_load(
+            vocoder_checkpoint, device,
+            lambda: load_vocoder(vocoder_checkpoint, device, int8=int8_vocoder),
+            variant="int8" if int8_vocoder else "",
+        )
+
+        with torch.no_grad(), torch.autocast(
+            device_type=device.type, dtype=torch.bfloat16, enabled=native_bf16(device),
+        ):
             waveform = vocoder(log_mel_2d)  # Pass LOG-mel to vocoder
             waveform = waveform.squeeze(0)  # (1, T)
     else:
@@ -310,27 +505,12 @@ def generate(
         waveform = F.pad(waveform, (0, TARGET_SAMPLES - waveform.shape[-1]))
 
     # Normalize
-    peak = waveform.abs().max()
-    if peak > 0:
-        waveform = waveform * (0.95 / peak)
-
-    # Exponential fade-out (1.0s–1.75s) + silent tail (1.75s–2.0s).
-    # Exponential curve (power=3) drops fast then tapers, keeping OTT from
-    # re-amplifying the tail. 0.25s of hard silence lets OTT fully release.
-    fade_start = int(1.0 * SAMPLE_RATE)
-    fade_end = int(1.75 * SAMPLE_RATE)
-    fade_samples = fade_end - fade_start
-    if fade_start < waveform.shape[-1]:
-        fade = torch.linspace(1.0, 0.0, fade_samples, device=waveform.device) ** 3
-        waveform[..., fade_start:fade_end] *= fade
-        waveform[..., fade_end:] = 0.0
-
-    # Save WAV using scipy (avoids torchcodec dependency)
-    import scipy.io.wavfile
-    waveform_cpu = waveform.cpu()
+    normalize_peak(waveform)
+
+    apply_fade_out(waveform)
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    audio_np = waveform_cpu.squeeze(0).numpy().astype(np.float32)
-    scipy.io.wavfile.write(str(output_path), SAMPLE_RATE, audio_np)
+    write_wav_int16(output_path, waveform)
     print(f"Saved: {output_path}")
     return output_path
 
@@ -340,9 +520,8 @@ def generate(
 # ---------------------------------------------------------------------------
 
 def generate_hash(length: int = 4) -> str:
-    """Generate a random alphanumeric hash."""
-    chars = string.ascii_letters + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
+    """Generate a random hex hash."""
+    return secrets.token_hex((length + 1) // 2)[:length]
 
 
 def main() -> None:
@@ -363,17 +542,28 @@ def main() -> None:
         help="VAE checkpoint",
     )
     parser.add_argument(
-        "--vocoder-ckpt", type=str,
-        default="weights/vocoder_epoch_50.pt",
-        help="HiFi-GAN vocoder checkpoint",
+        "--vocoder-ckpt", type=str, default=None,
+        help=f"Vocoder checkpoint (default: first existing of {', '.join(VOCODER_CHECKPOINTS)})",
     )
     parser.add_argument(
         "--no-vocoder", action="store_true",
         help="Skip vocoder, use Griffin-Lim fallback",
     )
+    parser.add_argument(
+        "--int8-vocoder", action="store_true",
+        help="Quantize vocoder conv weights to int8 (less VRAM and weight traffic)",
+    )
     args = parser.parse_args()
 
-    vocoder_path = None if args.no_vocoder else Path(args.vocoder_ckpt)
+    if args.no_vocoder:
+        vocoder_path = None
+    elif args.vocoder_ckpt is not None:
+        vocoder_path = Path(args.vocoder_ckpt)
+    else:
+        vocoder_path = next(
+            (Path(p) for p in VOCODER_CHECKPOINTS if Path(p).exists()),
+            Path(VOCODER_CHECKPOINTS[0]),
+        )
     output_path = Path(args.output) if args.output else None
 
     generate(
@@ -385,6 +575,7 @@ def main() -> None:
         ddim_steps=args.steps,
         output_path=output_path,
         seed=args.seed,
+        int8_vocoder=args.int8_vocoder,
     )
 
 
@@ -9,18 +9,22 @@ Output: (batch, 1, 128, 173) reconstructed log-mel spectrogram
 import torch
 import torch.nn as nn
 
+from models.layers import GroupNormSiLU
+
 
 class ResBlock(nn.Module):
     """Residual block with GroupNorm and SiLU activation."""
 
     def __init__(self, channels: int) -> None:
         super().__init__()
+        # Identity slots keep the block.N indices (and checkpoint keys) of the
+        # original GroupNorm, SiLU, Conv2d layout
         self.block = nn.Sequential(
-            nn.GroupNorm(8, channels),
-            nn.SiLU(),
+            GroupNormSiLU(8, channels),
+            nn.Identity(),
             nn.Conv2d(channels, channels, 3, padding=1),
-            nn.GroupNorm(8, channels),
-            nn.SiLU(),
+            GroupNormSiLU(8, channels),
+            nn.Identity(),
             nn.Conv2d(channels, channels, 3, padding=1),
         )
 
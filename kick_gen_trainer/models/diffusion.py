@@ -6,6 +6,8 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+from models.layers import GroupNormSiLU
+
 
 # ---------------------------------------------------------------------------
 # Noise schedule
@@ -24,11 +26,16 @@ class NoiseScheduler:
         self.betas = torch.linspace(beta_start, beta_end, timesteps)
         self.alphas = 1.0 - self.betas
         self.alpha_bars = torch.cumprod(self.alphas, dim=0)
+        # add_noise coefficients, precomputed per timestep
+        self.sqrt_alpha_bars = self.alpha_bars.sqrt()
+        self.sqrt_one_minus_alpha_bars = (1.0 - self.alpha_bars).sqrt()
 
     def to(self, device: torch.device) -> "NoiseScheduler":
         self.betas = self.betas.to(device)
         self.alphas = self.alphas.to(device)
         self.alpha_bars = self.alpha_bars.to(device)
+        self.sqrt_alpha_bars = self.sqrt_alpha_bars.to(device)
+        self.sqrt_one_minus_alpha_bars = self.sqrt_one_minus_alpha_bars.to(device)
         return self
 
     def add_noise(
@@ -38,23 +45,26 @@ class NoiseScheduler:
         t: torch.Tensor,
     ) -> torch.Tensor:
         """q(x_t | x_0) = sqrt(alpha_bar_t) * x_0 + sqrt(1 - alpha_bar_t) * noise"""
-        ab = self.alpha_bars[t]
         # Reshape for broadcasting: (batch, 1, 1, 1)
-        while ab.dim() < x.dim():
-            ab = ab.unsqueeze(-1)
-        return ab.sqrt() * x + (1 - ab).sqrt() * noise
+        bshape = (-1,) + (1,) * (x.dim() - 1)
+        return (
+            self.sqrt_alpha_bars[t].view(bshape) * x
+            + self.sqrt_one_minus_alpha_bars[t].view(bshape) * noise
+        )
 
 
 # ---------------------------------------------------------------------------
 # Building blocks
 # ---------------------------------------------------------------------------
 
-def sinusoidal_embedding(t: torch.Tensor, dim: int) -> torch.Tensor:
-    """Sinusoidal timestep embedding."""
+def sinusoidal_frequencies(dim: int) -> torch.Tensor:
+    """Frequency table for a dim-wide sinusoidal embedding."""
     half = dim // 2
-    freqs = torch.exp(
-        -math.log(10000) * torch.arange(half, device=t.device).float() / half
-    )
+    return torch.exp(-math.log(10000) * torch.arange(half).float() / half)
+
+
+def sinusoidal_embedding(t: torch.Tensor, freqs: torch.Tensor) -> torch.Tensor:
+    """Sinusoidal timestep embedding from a precomputed frequency table."""
     args = t.float().unsqueeze(1) * freqs.unsqueeze(0)
     return torch.cat([args.cos(), args.sin()], dim=1)
 
@@ -64,19 +74,17 @@ class CondResBlock(nn.Module):
 
     def __init__(self, channels: int, cond_dim: int) -> None:
         super().__init__()
-        self.norm1 = nn.GroupNorm(8, channels)
+        self.norm1 = GroupNormSiLU(8, channels)
         self.conv1 = nn.Conv2d(channels, channels, 3, padding=1)
-        self.norm2 = nn.GroupNorm(8, channels)
+        self.norm2 = GroupNormSiLU(8, channels)
         self.conv2 = nn.Conv2d(channels, channels, 3, padding=1)
         self.cond_proj = nn.Linear(cond_dim, channels)
 
     def forward(self, x: torch.Tensor, cond: torch.Tensor) -> torch.Tensor:
-        h = F.silu(self.norm1(x))
-        h = self.conv1(h)
+        h = self.conv1(self.norm1(x))
         # Inject conditioning
         h = h + self.cond_proj(cond)[:, :, None, None]
-        h = F.silu(self.norm2(h))
-        h = self.conv2(h)
+        h = self.conv2(self.norm2(h))
         return x + h
 
 
@@ -92,11 +100,15 @@ class SelfAttention2d(nn.Module):
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         b, c, h, w = x.shape
         h_norm = self.norm(x)
-        qkv = self.qkv(h_norm).reshape(b, 3, c, h * w)
-        q, k, v = qkv[:, 0], qkv[:, 1], qkv[:, 2]
-        attn = torch.bmm(q.transpose(1, 2), k) * (c ** -0.5)
-        attn = attn.softmax(dim=-1)
-        out = torch.bmm(v, attn.transpose(1, 2)).reshape(b, c, h, w)
+        # Split channels straight off the 1x1 conv into (b, 1 head, h*w, c)
+        # views; with channels_last activations these are copy-free with a
+        # unit-stride last dim
+        q, k, v = (
+            t.flatten(2).transpose(1, 2).unsqueeze(1)
+            for t in self.qkv(h_norm).chunk(3, dim=1)
+        )
+        out = F.scaled_dot_product_attention(q, k, v)  # default c ** -0.5 scale
+        out = out.squeeze(1).transpose(1, 2).reshape(b, c, h, w)
         return x + self.out(out)
 
 
@@ -119,7 +131,9 @@ class LatentUNet(nn.Module):
         super().__init__()
         ch = base_channels  # 64
 
-        # Timestep embedding
+        # Timestep embedding. The frequency table is derived, not learned, so it
+        # stays out of the state_dict and existing checkpoints load unchanged.
+        self.register_buffer("sin_freqs", sinusoidal_frequencies(ch), persistent=False)
         self.time_mlp = nn.Sequential(
             nn.Linear(ch, cond_dim),
             nn.SiLU(),
@@ -147,7 +161,7 @@ class LatentUNet(nn.Module):
         self.up_reduce1 = nn.Conv2d(ch * 2, ch, 1)
 
         # Output
-        self.out_norm = nn.GroupNorm(8, ch)
+        self.out_norm = GroupNormSiLU(8, ch)
         self.out_conv = nn.Conv2d(ch, latent_dim, 3, padding=1)
 
     def forward(
@@ -163,7 +177,7 @@ class LatentUNet(nn.Module):
             cond: (batch, cond_dim) conditioning vector (timestep_emb + text_emb combined externally, or just text)
         """
         # Timestep embedding
-        t_emb = sinusoidal_embedding(t, self.time_mlp[0].in_features)
+        t_emb = sinusoidal_embedding(t, self.sin_freqs)
         t_emb = self.time_mlp(t_emb)
         c = t_emb + cond  # Combined conditioning
 
@@ -192,5 +206,4 @@ class LatentUNet(nn.Module):
         h = self.up1(h, c)
         h = self.up_reduce1(h)                  # (ch, 8, 11)
 
-        h = F.silu(self.out_norm(h))
-        return self.out_conv(h)                 # (latent_dim, 8, 11)
+        return self.out_conv(self.out_norm(h))  # (latent_dim, 8, 11)
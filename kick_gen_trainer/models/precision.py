@@ -0,0 +1,12 @@
+"""Mixed-precision helpers shared by training and inference."""
+
+import torch
+
+
+def native_bf16(device: torch.device) -> bool:
+    """Whether bf16 runs natively on device (CUDA compute capability 8.0+).
+
+    torch.cuda.is_bf16_supported() also returns True on older GPUs (T4, V100,
+    Turing) that only emulate bf16, which is slower there than fp16 or fp32.
+    """
+    return device.type == "cuda" and torch.cuda.get_device_capability(device)[0] >= 8
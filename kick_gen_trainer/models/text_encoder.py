@@ -1,25 +1,52 @@
 """Keyword-based text encoder for conditioning the diffusion model."""
 
-import csv
+import itertools
 from pathlib import Path
 
 import torch
 import torch.nn as nn
 
 
-def build_vocab(metadata_csv: Path, min_count: int = 5) -> list[str]:
-    """Build vocabulary from metadata CSV keywords, filtering rare tokens."""
-    counts: dict[str, int] = {}
-    with open(metadata_csv) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            for kw in row["keywords"].split(","):
-                kw = kw.strip().lower()
-                if kw:
-                    counts[kw] = counts.get(kw, 0) + 1
+def load_metadata(
+    metadata_csv: Path, min_count: int = 5,
+) -> tuple[list[str], dict[str, list[int]]]:
+    """Parse the metadata CSV once into (vocab, filename_stem -> keyword ids).
 
-    vocab = sorted(kw for kw, c in counts.items() if c >= min_count)
-    return vocab
+    The vocabulary keeps keywords seen at least ``min_count`` times. The
+    result is cached next to the CSV and reused while its mtime is unchanged.
+    """
+    # Training-only dependency; keep it out of the inference import path
+    import pandas as pd
+
+    cache_path = metadata_csv.with_suffix(".vocab.pt")
+    mtime = metadata_csv.stat().st_mtime
+    if cache_path.exists():
+        cached = torch.load(cache_path, weights_only=True)
+        if cached["mtime"] == mtime and cached["min_count"] == min_count:
+            return cached["vocab"], cached["stem_to_ids"]
+
+    df = pd.read_csv(
+        metadata_csv, usecols=["filename", "keywords"], dtype=str, keep_default_na=False,
+    )
+    # One row per (file, keyword), indexed by the file's row number
+    kws = df["keywords"].str.lower().str.split(",").explode().str.strip()
+    kws = kws[kws != ""]
+
+    counts = kws.value_counts()
+    vocab = sorted(counts[counts >= min_count].index)
+    kw_to_idx = {kw: i for i, kw in enumerate(vocab)}
+
+    row_ids = kws.map(kw_to_idx).dropna().astype(int).groupby(level=0).agg(list)
+    stem_to_ids = {
+        Path(name).stem: [int(i) for i in row_ids.get(row, [])]
+        for row, name in df["filename"].items()
+    }
+
+    torch.save(
+        {"mtime": mtime, "min_count": min_count, "vocab": vocab, "stem_to_ids": stem_to_ids},
+        cache_path,
+    )
+    return vocab, stem_to_ids
 
 
 class KeywordEncoder(nn.Module):
@@ -32,7 +59,8 @@ class KeywordEncoder(nn.Module):
         cond_dim: int = 256,
     ) -> None:
         super().__init__()
-        self.embedding = nn.Embedding(vocab_size, embed_dim)
+        # Mean-pooled bag of keywords; same weight layout as nn.Embedding
+        self.embedding = nn.EmbeddingBag(vocab_size, embed_dim, mode="mean")
         self.proj = nn.Linear(embed_dim, cond_dim)
         self.null_embedding = nn.Parameter(torch.randn(cond_dim))
 
@@ -46,12 +74,15 @@ class KeywordEncoder(nn.Module):
         Returns:
             (batch, cond_dim) conditioning tensor.
         """
-        batch_embs = []
-        for ids in token_ids:
-            if len(ids) == 0:
-                batch_embs.append(self.null_embedding)
-            else:
-                idx = torch.tensor(ids, device=device)
-                emb = self.embedding(idx).mean(dim=0)
-                batch_embs.append(self.proj(emb))
-        return torch.stack(batch_embs)
+        lengths = [len(ids) for ids in token_ids]
+        flat = torch.tensor(
+            [i for ids in token_ids for i in ids], dtype=torch.long, device=device,
+        )
+        offsets = torch.tensor(
+            [0, *itertools.accumulate(lengths)][:-1], dtype=torch.long, device=device,
+        )
+        out = self.proj(self.embedding(flat, offsets))
+
+        # Empty keyword lists get the learned null embedding
+        empty = torch.tensor([n == 0 for n in lengths], device=device).unsqueeze(1)
+        return torch.where(empty, self.null_embedding, out)
@@ -14,26 +14,41 @@ import torch.nn.functional as F
 # Generator
 # ---------------------------------------------------------------------------
 
+def _res_conv(channels: int, kernel_size: int, dilation: int, depthwise: bool) -> nn.Module:
+    """Weight-normed dilated conv, or its depthwise-separable version.
+
+    The separable version runs a per-channel dilated conv followed by a 1x1
+    pointwise conv (weight norm on the pointwise conv only), cutting weights
+    and FLOPs by about kernel_size x.
+    """
+    padding = (kernel_size * dilation - dilation) // 2
+    if not depthwise:
+        return nn.utils.parametrizations.weight_norm(
+            nn.Conv1d(channels, channels, kernel_size, dilation=dilation, padding=padding)
+        )
+    return nn.Sequential(
+        nn.Conv1d(channels, channels, kernel_size, dilation=dilation,
+                  padding=padding, groups=channels),
+        nn.utils.parametrizations.weight_norm(nn.Conv1d(channels, channels, 1)),
+    )
+
+
 class ResBlock1(nn.Module):
     """Residual block with dilated convolutions (HiFi-GAN type 1)."""
 
-    def __init__(self, channels: int, kernel_size: int, dilations: tuple[int, ...] = (1, 3, 5)) -> None:
+    def __init__(
+        self,
+        channels: int,
+        kernel_size: int,
+        dilations: tuple[int, ...] = (1, 3, 5),
+        depthwise: bool = False,
+    ) -> None:
         super().__init__()
         self.convs1 = nn.ModuleList()
         self.convs2 = nn.ModuleList()
         for d in dilations:
-            self.convs1.append(
-                nn.utils.parametrizations.weight_norm(
-                    nn.Conv1d(channels, channels, kernel_size, dilation=d,
-                              padding=(kernel_size * d - d) // 2)
-                )
-            )
-            self.convs2.append(
-                nn.utils.parametrizations.weight_norm(
-                    nn.Conv1d(channels, channels, kernel_size, dilation=1,
-                              padding=(kernel_size - 1) // 2)
-                )
-            )
+            self.convs1.append(_res_conv(channels, kernel_size, d, depthwise))
+            self.convs2.append(_res_conv(channels, kernel_size, 1, depthwise))
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         for c1, c2 in zip(self.convs1, self.convs2):
@@ -45,17 +60,39 @@ class ResBlock1(nn.Module):
         return x
 
     def remove_weight_norm(self) -> None:
-        for c in self.convs1:
-            nn.utils.parametrize.remove_parametrizations(c, "weight")
-        for c in self.convs2:
+        for c in [*self.convs1, *self.convs2]:
+            # Separable convs carry weight norm on the pointwise conv only
+            if isinstance(c, nn.Sequential):
+                c = c[1]
             nn.utils.parametrize.remove_parametrizations(c, "weight")
 
 
+def _group_resblocks(resblocks: nn.ModuleList, group_size: int) -> list[tuple[ResBlock1, ...]]:
+    """Split resblocks into consecutive groups of parallel blocks.
+
+    Returned as a plain list (not a ModuleList), so the blocks stay registered
+    once and state_dict keys remain under ``resblocks``.
+    """
+    return [tuple(resblocks[i:i + group_size]) for i in range(0, len(resblocks), group_size)]
+
+
+def _mrf(x: torch.Tensor, blocks: tuple[ResBlock1, ...]) -> torch.Tensor:
+    """Average parallel resblocks on one input (HiFi-GAN's multi-receptive-field fusion).
+
+    Accumulates in place into the first block's output.
+    """
+    xs = blocks[0](x)
+    for block in blocks[1:]:
+        xs += block(x)
+    return xs.div_(len(blocks))
+
+
 class HiFiGANGenerator(nn.Module):
     """HiFi-GAN v1 generator (simplified for 6GB VRAM).
 
     Upsamples mel spectrogram (128, T) to waveform (1, T * hop_length).
     Uses smaller channel counts than the original paper to fit in memory.
+    With ``depthwise``, the resblock convs are depthwise-separable.
     """
 
     def __init__(
@@ -66,6 +103,7 @@ class HiFiGANGenerator(nn.Module):
         upsample_kernel_sizes: tuple[int, ...] = (16, 16, 4, 4, 4),
         resblock_kernel_sizes: tuple[int, ...] = (3, 7, 11),
         resblock_dilations: tuple[tuple[int, ...], ...] = ((1, 3, 5), (1, 3, 5), (1, 3, 5)),
+        depthwise: bool = False,
     ) -> None:
         super().__init__()
         self.num_upsamples = len(upsample_rates)
@@ -92,7 +130,9 @@ class HiFiGANGenerator(nn.Module):
         for i in range(len(self.ups)):
             ch_i = upsample_initial_channel // (2 ** (i + 1))
             for k, d in zip(resblock_kernel_sizes, resblock_dilations):
-                self.resblocks.append(ResBlock1(ch_i, k, d))
+                self.resblocks.append(ResBlock1(ch_i, k, d, depthwise))
+        # Per-upsample groups, sliced once so forward does no index math
+        self._res_groups = _group_resblocks(self.resblocks, len(resblock_kernel_sizes))
 
         # Output conv
         self.conv_post = nn.utils.parametrizations.weight_norm(
@@ -106,17 +146,18 @@ class HiFiGANGenerator(nn.Module):
         Returns:
             (batch, 1, time * hop_length) waveform
         """
-        x = self.conv_pre(x)
-        for i, up in enumerate(self.ups):
+        # conv_pre / conv_post stay fp32 under autocast, keeping the mel
+        # input and the waveform output at full precision
+        with torch.autocast(device_type=x.device.type, enabled=False):
+            x = self.conv_pre(x.float())
+        for up, blocks in zip(self.ups, self._res_groups):
             x = F.leaky_relu(x, 0.1)
             x = up(x)
             # Apply all resblocks for this upsample level and average
-            xs = 0.0
-            for j in range(len(self.resblocks) // self.num_upsamples):
-                xs = xs + self.resblocks[i * (len(self.resblocks) // self.num_upsamples) + j](x)
-            x = xs / (len(self.resblocks) // self.num_upsamples)
+            x = _mrf(x, blocks)
         x = F.leaky_relu(x, 0.1)
-        x = self.conv_post(x)
+        with torch.autocast(device_type=x.device.type, enabled=False):
+            x = self.conv_post(x.float())
         x = torch.tanh(x)
         return x
 
@@ -129,6 +170,168 @@ class HiFiGANGenerator(nn.Module):
         nn.utils.parametrize.remove_parametrizations(self.conv_post, "weight")
 
 
+class ISTFTGenerator(nn.Module):
+    """Vocos-style generator: predicts an STFT and inverts it with one iSTFT.
+
+    Replaces the transposed-conv ladder of HiFiGANGenerator. All ResBlock1
+    layers run at mel frame rate, and a single ``torch.istft`` produces the
+    waveform, so far fewer bytes move through memory than when upsampling
+    activations 512x. Input and output shapes match HiFiGANGenerator.
+    """
+
+    def __init__(
+        self,
+        in_channels: int = 128,
+        channels: int = 256,
+        num_stages: int = 3,
+        n_fft: int = 2048,
+        hop_length: int = 512,
+        resblock_kernel_sizes: tuple[int, ...] = (3, 7, 11),
+        resblock_dilations: tuple[tuple[int, ...], ...] = ((1, 3, 5), (1, 3, 5), (1, 3, 5)),
+        depthwise: bool = False,
+    ) -> None:
+        super().__init__()
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+
+        self.conv_pre = nn.utils.parametrizations.weight_norm(
+            nn.Conv1d(in_channels, channels, 7, padding=3)
+        )
+
+        # Stages of parallel resblocks averaged like HiFi-GAN's MRF, no upsampling
+        self.resblocks = nn.ModuleList()
+        for _ in range(num_stages):
+            for k, d in zip(resblock_kernel_sizes, resblock_dilations):
+                self.resblocks.append(ResBlock1(channels, k, d, depthwise))
+        self._res_groups = _group_resblocks(self.resblocks, len(resblock_kernel_sizes))
+
+        # Log-magnitude and phase for n_fft // 2 + 1 bins each
+        self.conv_post = nn.utils.parametrizations.weight_norm(
+            nn.Conv1d(channels, n_fft + 2, 7, padding=3)
+        )
+        self.register_buffer("window", torch.hann_window(n_fft), persistent=False)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Args:
+            x: (batch, n_mels, time) mel spectrogram
+        Returns:
+            (batch, 1, time * hop_length) waveform
+        """
+        num_frames = x.shape[-1]
+        # As in HiFiGANGenerator, conv_pre / conv_post stay fp32 under autocast
+        with torch.autocast(device_type=x.device.type, enabled=False):
+            x = self.conv_pre(x.float())
+        for blocks in self._res_groups:
+            x = _mrf(x, blocks)
+        x = F.leaky_relu(x, 0.1)
+        # The iSTFT needs fp32 too (no half-precision FFT support under autocast)
+        with torch.autocast(device_type=x.device.type, enabled=False):
+            x = self.conv_post(x.float())
+        log_mag, phase = x.chunk(2, dim=1)
+        spec = torch.polar(torch.exp(log_mag).clamp(max=1e2), phase)
+        audio = torch.istft(
+            spec, n_fft=self.n_fft, hop_length=self.hop_length,
+            win_length=self.n_fft, window=self.window,
+            length=num_frames * self.hop_length,
+        )
+        return audio.unsqueeze(1)
+
+    def remove_weight_norm(self) -> None:
+        nn.utils.parametrize.remove_parametrizations(self.conv_pre, "weight")
+        for block in self.resblocks:
+            block.remove_weight_norm()
+        nn.utils.parametrize.remove_parametrizations(self.conv_post, "weight")
+
+
+# Generator classes by the name stored in vocoder checkpoints
+GENERATORS: dict[str, type[nn.Module]] = {
+    "hifigan": HiFiGANGenerator,
+    "istft": ISTFTGenerator,
+}
+
+
+# ---------------------------------------------------------------------------
+# Inference preparation
+# ---------------------------------------------------------------------------
+
+def freeze_for_inference(generator: nn.Module, dtype: torch.dtype | None = None) -> nn.Module:
+    """Fold weight norm and freeze a generator for inference, in place.
+
+    Sets eval mode, folds the weight-norm parametrizations into plain conv
+    weights and turns off requires_grad. With ``dtype`` (the autocast dtype
+    the generator will run under), all conv weights except conv_pre and
+    conv_post, which run in fp32, are cast once here instead of by autocast
+    on every forward. One-way: the result cannot resume training.
+    """
+    generator.eval()
+    generator.remove_weight_norm()
+    generator.requires_grad_(False)
+    if dtype is not None:
+        keep = {id(generator.conv_pre), id(generator.conv_post)}
+        for m in generator.modules():
+            if isinstance(m, (nn.Conv1d, nn.ConvTranspose1d)) and id(m) not in keep:
+                m.to(dtype)
+    return generator
+
+
+class Int8WeightOnlyConv1d(nn.Module):
+    """Conv1d / ConvTranspose1d with int8 weights and per-output-channel scales.
+
+    Stores the weight as int8 plus one fp16 scale per output channel, a
+    quarter of the fp32 weight bytes, and dequantizes to the input dtype on
+    each forward. Built from an existing (weight-norm-free) conv.
+    """
+
+    def __init__(self, conv: nn.Conv1d | nn.ConvTranspose1d) -> None:
+        super().__init__()
+        self.transposed = isinstance(conv, nn.ConvTranspose1d)
+        self.stride = conv.stride
+        self.padding = conv.padding
+        self.output_padding = conv.output_padding
+        self.dilation = conv.dilation
+        self.groups = conv.groups
+
+        # Output channels are dim 0 of a Conv1d weight, dim 1 of a ConvTranspose1d
+        w = conv.weight.detach().float()
+        out_dim = 1 if self.transposed else 0
+        reduce_dims = [d for d in range(w.dim()) if d != out_dim]
+        scale = w.abs().amax(dim=reduce_dims, keepdim=True).clamp(min=1e-8) / 127
+        self.register_buffer("weight_int8", torch.round(w / scale).clamp(-128, 127).to(torch.int8))
+        self.register_buffer("scale", scale.half())
+        self.register_buffer("bias", None if conv.bias is None else conv.bias.detach().clone())
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        weight = self.weight_int8.to(x.dtype) * self.scale.to(x.dtype)
+        bias = None if self.bias is None else self.bias.to(x.dtype)
+        if self.transposed:
+            return F.conv_transpose1d(
+                x, weight, bias, self.stride, self.padding,
+                self.output_padding, self.groups, self.dilation,
+            )
+        return F.conv1d(x, weight, bias, self.stride, self.padding, self.dilation, self.groups)
+
+
+def quantize_(generator: nn.Module, min_weight_bytes: int = 16 * 1024) -> nn.Module:
+    """Swap a generator's convs for Int8WeightOnlyConv1d in place (gpt-fast style).
+
+    Call after ``remove_weight_norm()``. conv_pre and conv_post stay in full
+    precision to protect input and output fidelity, as do convs whose fp32
+    weight is at most ``min_weight_bytes``.
+    """
+    keep = {id(generator.conv_pre), id(generator.conv_post)}
+    for parent in list(generator.modules()):
+        for name, child in list(parent.named_children()):
+            if not isinstance(child, (nn.Conv1d, nn.ConvTranspose1d)) or id(child) in keep:
+                continue
+            if nn.utils.parametrize.is_parametrized(child):
+                raise ValueError("quantize_ needs plain weights; call remove_weight_norm() first")
+            if child.weight.numel() * 4 <= min_weight_bytes:
+                continue
+            setattr(parent, name, Int8WeightOnlyConv1d(child))
+    return generator
+
+
 # ---------------------------------------------------------------------------
 # Discriminators
 # ---------------------------------------------------------------------------
@@ -147,10 +350,16 @@ class PeriodDiscriminator(nn.Module):
             nn.utils.parametrizations.weight_norm(nn.Conv2d(256, 256, (5, 1), 1, (2, 0))),
         ])
         self.conv_post = nn.utils.parametrizations.weight_norm(nn.Conv2d(256, 1, (3, 1), 1, (1, 0)))
+        # NHWC weights make cuDNN pick its channels_last kernels. The
+        # (B, 1, T/p, p) input is already valid NHWC (C == 1) and later
+        # .to(device) calls preserve the layout
+        self.to(memory_format=torch.channels_last)
 
     def forward(self, x: torch.Tensor) -> tuple[torch.Tensor, list[torch.Tensor]]:
         fmap = []
-        # Reshape: (B, 1, T) -> (B, 1, T//p, p)
+        # Reshape: (B, 1, T) -> (B, 1, T//p, p). The view is free; it is kept
+        # because a period-dilated Conv1d only matches the (5, 1) convs at
+        # stride 1, and the stride-3 layers would need 3x the work plus a gather
         b, c, t = x.shape
         if t % self.period != 0:
             x = F.pad(x, (0, self.period - t % self.period), "reflect")
@@ -167,6 +376,13 @@ class PeriodDiscriminator(nn.Module):
 
 
 class MultiPeriodDiscriminator(nn.Module):
+    """Period sub-discriminators, run one after another.
+
+    The heads are not batched into one grouped Conv2d stack: head p sees
+    B * p columns of length T / p, so a common frame would need padding to
+    (B * 11, T / 2) per head, about 5x the real work for fewer launches.
+    """
+
     def __init__(self, periods: tuple[int, ...] = (2, 3, 5, 7, 11)) -> None:
         super().__init__()
         self.discriminators = nn.ModuleList([PeriodDiscriminator(p) for p in periods])
@@ -3,12 +3,15 @@ Aggregate kick samples from nested folders into a single flat folder.
 Copies files (originals remain untouched) and generates metadata CSV.
 """
 
+import csv
 import hashlib
+import os
 import re
 import shutil
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import pandas as pd
 from tqdm import tqdm
 
 # Configuration
@@ -16,48 +19,57 @@ SOURCE_DIR = Path("/Users/hookline/Dropbox/PRESTIGEWORLDWIDE/02_Samples")
 DEST_DIR = Path(__file__).parent.parent / "data" / "raw"
 METADATA_PATH = Path(__file__).parent.parent / "data" / "metadata.csv"
 
-# Audio extensions to include
-AUDIO_EXTENSIONS = {".wav", ".aif", ".aiff", ".mp3", ".flac", ".ogg", ".m4a"}
+# Audio extensions to include (lowercase tuple, for str.endswith)
+AUDIO_EXTENSIONS = (".wav", ".aif", ".aiff", ".mp3", ".flac", ".ogg", ".m4a")
 
+# Concurrent copies; each one stalls on file I/O, not the GIL
+COPY_WORKERS = 32
 
-def extract_keywords(filename: str) -> list[str]:
-    """Extract descriptive keywords from filename."""
-    # Remove extension
-    name = Path(filename).stem
+# Keyword separators in filenames
+_KW_SPLIT_RE = re.compile(r"[-_\s.]+")
 
-    # Split on common separators
-    parts = re.split(r"[-_\s.]+", name)
 
-    # Clean up: lowercase, remove pure numbers, filter short strings
-    keywords = []
-    for part in parts:
-        cleaned = part.lower().strip()
-        # Skip pure numbers, very short strings, or common non-descriptive words
-        if cleaned and not cleaned.isdigit() and len(cleaned) > 1:
-            keywords.append(cleaned)
+def extract_keywords(filename: str) -> list[str]:
+    """Extract descriptive keywords from filename."""
+    # Remove extension, lowercase once, split on common separators
+    parts = _KW_SPLIT_RE.split(Path(filename).stem.lower())
 
-    return keywords
+    # Skip pure numbers and very short strings (including empty edge parts)
+    return [part for part in parts if len(part) > 1 and not part.isdigit()]
 
 
 def get_short_hash(filepath: Path) -> str:
     """Generate short hash from file path for unique naming."""
     hash_input = str(filepath).encode()
-    return hashlib.md5(hash_input).hexdigest()[:6]
+    # Non-cryptographic use: a 3-byte BLAKE2b digest, i.e. 6 hex chars
+    return hashlib.blake2b(hash_input, digest_size=3).hexdigest()
+
+
+def is_kick_file(entry: os.DirEntry) -> bool:
+    """Check if a directory entry is a kick sample based on filename and size."""
+    name_lower = entry.name.lower()
+    # "kick" rejects most names, so test it first; all name checks run before
+    # the stat() call, which only name-accepted candidates pay for
+    if (
+        "kick" not in name_lower
+        or not name_lower.endswith(AUDIO_EXTENSIONS)
+        or "loop" in name_lower
+        or "bpm" in name_lower
+    ):
+        return False
+    return 5_000 <= entry.stat().st_size <= 1_000_000
 
 
-def is_kick_file(filepath: Path) -> bool:
-    """Check if file is a kick sample based on filename and size."""
-    name_lower = filepath.name.lower()
-    if "kick" not in name_lower:
-        return False
-    if "loop" in name_lower:
-        return False
-    if "bpm" in name_lower:
-        return False
-    size = filepath.stat().st_size
-    if size > 1_000_000 or size < 5_000:
-        return False
-    return True
+def iter_kick_files(root: Path) -> Iterator[Path]:
+    """Yield kick samples under root, walking the tree once with os.scandir."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file() and is_kick_file(entry):
+                    yield Path(entry.path)
 
 
 def aggregate_kicks(dry_run: bool = False) -> None:
@@ -74,50 +86,54 @@ def aggregate_kicks(dry_run: bool = False) -> None:
 
     # Find all audio files with "kick" in the name
     print(f"Scanning {SOURCE_DIR}...")
-    all_files = []
-    for ext in AUDIO_EXTENSIONS:
-        all_files.extend(SOURCE_DIR.rglob(f"*{ext}"))
-        all_files.extend(SOURCE_DIR.rglob(f"*{ext.upper()}"))
-
-    kick_files = [f for f in all_files if is_kick_file(f)]
+    kick_files = sorted(iter_kick_files(SOURCE_DIR))
     print(f"Found {len(kick_files)} kick samples")
 
     if dry_run:
         print("Dry run - no files copied")
         return
 
-    # Copy files and build metadata
-    metadata_rows = []
-
-    for filepath in tqdm(kick_files, desc="Copying kicks"):
+    # Assign unique filenames up front (no I/O), so copies can run in any order
+    jobs: list[tuple[Path, str]] = []
+    used_names: set[str] = set()
+    for filepath in kick_files:
         # Generate unique filename with hash prefix
         short_hash = get_short_hash(filepath)
         new_name = f"{short_hash}_{filepath.name}"
-        dest_path = DEST_DIR / new_name
 
         # Handle edge case of hash collision
         counter = 1
-        while dest_path.exists():
+        while new_name in used_names:
             new_name = f"{short_hash}_{counter}_{filepath.name}"
-            dest_path = DEST_DIR / new_name
             counter += 1
+        used_names.add(new_name)
+        jobs.append((filepath, new_name))
 
-        # Copy file
-        shutil.copy2(filepath, dest_path)
+    def copy_one(job: tuple[Path, str]) -> dict[str, str]:
+        filepath, new_name = job
+        # File contents only; timestamps/permissions aren't used downstream
+        shutil.copyfile(filepath, DEST_DIR / new_name)
 
         # Extract metadata
         keywords = extract_keywords(filepath.name)
-        metadata_rows.append({
+        return {
             "filename": new_name,
             "original_path": str(filepath),
             "keywords": ",".join(keywords),
-        })
-
-    # Save metadata
-    df = pd.DataFrame(metadata_rows)
-    df.to_csv(METADATA_PATH, index=False)
+        }
+
+    # Copy files, streaming each metadata row to the CSV as its copy
+    # finishes (map keeps rows in kick_files order)
+    with open(METADATA_PATH, "w", newline="") as f, \
+            ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        writer = csv.DictWriter(
+            f, fieldnames=["filename", "original_path", "keywords"], lineterminator="\n",
+        )
+        writer.writeheader()
+        for row in tqdm(pool.map(copy_one, jobs), total=len(jobs), desc="Copying kicks"):
+            writer.writerow(row)
     print(f"Saved metadata to {METADATA_PATH}")
-    print(f"Copied {len(metadata_rows)} files to {DEST_DIR}")
+    print(f"Copied {len(jobs)} files to {DEST_DIR}")
 
 
 if __name__ == "__main__":
@@ -8,10 +8,14 @@ For each audio file in data/raw/:
   4. Pad or trim to 2 seconds
   5. Apply 0.2s fade-out
   6. Compute mel spectrogram
-  7. Save as .pt tensor in data/processed/
+  7. Write into one memory-mapped shard in data/processed/
+     (mels.npy + mels_stems.json, see training/shards.py)
 """
 
+import multiprocessing as mp
+import os
 import shutil
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
@@ -20,6 +24,8 @@ import torch
 import torchaudio
 from tqdm import tqdm
 
+from training import shards
+
 # Paths
 RAW_DIR = Path(__file__).parent.parent / "data" / "raw"
 PROCESSED_DIR = Path(__file__).parent.parent / "data" / "processed"
@@ -36,23 +42,38 @@ PEAK_DB = -1.0
 N_FFT = 2048
 HOP_LENGTH = 512
 N_MELS = 128
+N_FRAMES = TARGET_SAMPLES // HOP_LENGTH + 1  # 173 (centered STFT)
+
+AUDIO_EXTENSIONS = {".wav", ".aif", ".aiff", ".mp3", ".flac", ".ogg", ".m4a"}
+
+# Waveforms per MelSpectrogram call when computing mels on the GPU
+MEL_BATCH_SIZE = 32
 
+# Built once per process and reused for every file
+_FADE = torch.linspace(1.0, 0.0, FADE_OUT_SAMPLES)
+_RESAMPLERS: dict[int, torchaudio.transforms.Resample] = {}
 
-def apply_fade_out(waveform: torch.Tensor, fade_samples: int) -> torch.Tensor:
-    """Apply a linear fade-out to the last fade_samples of the waveform."""
-    fade = torch.linspace(1.0, 0.0, fade_samples)
-    waveform[0, -fade_samples:] *= fade
+
+def apply_fade_out(waveform: torch.Tensor) -> torch.Tensor:
+    """Apply a linear fade-out to the last FADE_OUT_SAMPLES of the waveform."""
+    waveform[0, -FADE_OUT_SAMPLES:] *= _FADE
     return waveform
 
 
-def preprocess_file(
-    filepath: Path,
-    mel_transform: torchaudio.transforms.MelSpectrogram,
-) -> torch.Tensor | None:
-    """Load an audio file and return its mel spectrogram tensor.
+def get_resampler(sr: int) -> torchaudio.transforms.Resample:
+    """Resampler from sr to SAMPLE_RATE, cached per source rate."""
+    resampler = _RESAMPLERS.get(sr)
+    if resampler is None:
+        resampler = torchaudio.transforms.Resample(sr, SAMPLE_RATE)
+        _RESAMPLERS[sr] = resampler
+    return resampler
+
+
+def load_waveform(filepath: Path) -> torch.Tensor | None:
+    """Load an audio file as a mono, 2s, normalized and faded waveform.
 
     Returns:
-        Mel spectrogram tensor of shape (1, 128, T), or None on failure.
+        Waveform tensor of shape (1, TARGET_SAMPLES), or None on failure.
     """
     try:
         audio, sr = sf.read(filepath, dtype="float32")
@@ -72,8 +93,7 @@ def preprocess_file(
 
     # Resample
     if sr != SAMPLE_RATE:
-        resampler = torchaudio.transforms.Resample(sr, SAMPLE_RATE)
-        waveform = resampler(waveform)
+        waveform = get_resampler(sr)(waveform)
 
     # Pad or trim to target length
     current_samples = waveform.shape[1]
@@ -90,50 +110,121 @@ def preprocess_file(
         waveform = waveform * (target_peak / peak)
 
     # Fade out
-    waveform = apply_fade_out(waveform, FADE_OUT_SAMPLES)
+    return apply_fade_out(waveform)
+
 
-    # Mel spectrogram
+def waveform_to_log_mel(
+    waveform: torch.Tensor,
+    mel_transform: torchaudio.transforms.MelSpectrogram,
+) -> torch.Tensor:
+    """Log mel spectrogram of a (..., samples) waveform or batch."""
     mel = mel_transform(waveform)
+    return torch.log(mel.clamp(min=1e-5))
 
-    # Convert to log scale
-    mel = torch.log(mel.clamp(min=1e-5))
 
-    return mel
+def preprocess_file(
+    filepath: Path,
+    mel_transform: torchaudio.transforms.MelSpectrogram,
+) -> torch.Tensor | None:
+    """Load an audio file and return its mel spectrogram tensor.
 
+    Returns:
+        Mel spectrogram tensor of shape (1, 128, T), or None on failure.
+    """
+    waveform = load_waveform(filepath)
+    if waveform is None:
+        return None
+    return waveform_to_log_mel(waveform, mel_transform)
 
-def preprocess_all() -> None:
-    """Process all raw audio files into mel spectrograms."""
-    if PROCESSED_DIR.exists():
-        shutil.rmtree(PROCESSED_DIR)
-    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
-    mel_transform = torchaudio.transforms.MelSpectrogram(
+@lru_cache(maxsize=1)
+def get_mel_transform() -> torchaudio.transforms.MelSpectrogram:
+    """Mel transform, built once per process."""
+    return torchaudio.transforms.MelSpectrogram(
         sample_rate=SAMPLE_RATE,
         n_fft=N_FFT,
         hop_length=HOP_LENGTH,
         n_mels=N_MELS,
     )
 
-    raw_files = list(RAW_DIR.iterdir())
-    success = 0
-    failed = 0
 
-    for filepath in tqdm(raw_files, desc="Preprocessing"):
-        if filepath.suffix.lower() not in {
-            ".wav", ".aif", ".aiff", ".mp3", ".flac", ".ogg", ".m4a",
-        }:
-            continue
+def _init_worker() -> None:
+    # One torch thread per process; parallelism comes from the pool
+    torch.set_num_threads(1)
+
 
-        mel = preprocess_file(filepath, mel_transform)
-        if mel is None:
-            failed += 1
-            continue
+def _process(filepath: Path) -> tuple[str, np.ndarray | None]:
+    """Pool worker: preprocess one file. Returns (stem, mel or None)."""
+    mel = preprocess_file(filepath, get_mel_transform())
+    return filepath.stem, None if mel is None else mel.numpy()
 
-        out_path = PROCESSED_DIR / f"{filepath.stem}.pt"
-        torch.save(mel, out_path)
-        success += 1
 
-    print(f"Done: {success} processed, {failed} failed")
+def _load(filepath: Path) -> tuple[str, np.ndarray | None]:
+    """Pool worker for the GPU path: decode only. Returns (stem, waveform or None)."""
+    waveform = load_waveform(filepath)
+    return filepath.stem, None if waveform is None else waveform.numpy()
+
+
+def preprocess_all(num_workers: int | None = None) -> None:
+    """Process all raw audio files into a single mel spectrogram shard."""
+    if PROCESSED_DIR.exists():
+        shutil.rmtree(PROCESSED_DIR)
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Sorted so shard rows (and the seeded train/val splits over them) don't
+    # depend on directory listing order
+    raw_files = sorted(
+        Path(e.path) for e in os.scandir(RAW_DIR)
+        if os.path.splitext(e.name)[1].lower() in AUDIO_EXTENSIONS
+        and not e.name.startswith("._")
+    )
+    mels = shards.open_writer(PROCESSED_DIR, "mels", (len(raw_files), 1, N_MELS, N_FRAMES))
+    stems: list[str] = []
+    failed = 0
+
+    # With CUDA, workers only decode audio and the parent computes mels in
+    # batches on the GPU; otherwise each worker computes its own mel.
+    mel_transform = None
+    if torch.cuda.is_available():
+        mel_transform = get_mel_transform().to("cuda")
+    batch_stems: list[str] = []
+    batch_waves: list[np.ndarray] = []
+
+    def write_gpu_batch() -> None:
+        waves = torch.from_numpy(np.stack(batch_waves)).pin_memory()
+        batch = waveform_to_log_mel(waves.to("cuda", non_blocking=True), mel_transform)
+        start = len(stems)
+        mels[start:start + len(batch_stems)] = batch.cpu().numpy()
+        stems.extend(batch_stems)
+        batch_stems.clear()
+        batch_waves.clear()
+
+    # Workers return ~88KB-350KB arrays; the parent writes them into the
+    # shard. imap (not imap_unordered) yields results in raw_files order, and
+    # the GPU batches keep that order, so rows follow the sorted file list
+    worker = _process if mel_transform is None else _load
+    with mp.Pool(num_workers or os.cpu_count(), initializer=_init_worker) as pool:
+        for stem, out in tqdm(
+            pool.imap(worker, raw_files, chunksize=8),
+            total=len(raw_files),
+            desc="Preprocessing",
+        ):
+            if out is None:
+                failed += 1
+                continue
+            if mel_transform is None:
+                mels[len(stems)] = out
+                stems.append(stem)
+                continue
+            batch_stems.append(stem)
+            batch_waves.append(out)
+            if len(batch_waves) == MEL_BATCH_SIZE:
+                write_gpu_batch()
+        if batch_waves:
+            write_gpu_batch()
+
+    shards.finalize(PROCESSED_DIR, "mels", mels, stems)
+    print(f"Done: {len(stems)} processed, {failed} failed")
 
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 """Training hyperparameters."""
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import Any
 
 
 @dataclass
@@ -17,7 +18,7 @@ class AutoencoderConfig:
     batch_size: int = 32
     learning_rate: float = 1e-4
     epochs: int = 100
-    num_workers: int = 4
+    num_workers: int = 0  # MelDataset is fully in memory; workers only add IPC
 
     # KL annealing: weight ramps from kl_weight_start to kl_weight_end
     # over the first kl_anneal_epochs epochs
@@ -28,6 +29,10 @@ class AutoencoderConfig:
     # Mixed precision
     use_amp: bool = True
 
+    # torch.compile (CUDA only)
+    compile_model: bool = True
+    compile_mode: str = "reduce-overhead"
+
     # Checkpointing
     checkpoint_dir: Path = Path("checkpoints")
     checkpoint_every: int = 10
@@ -56,6 +61,7 @@ class DiffusionConfig:
     # VAE
     vae_checkpoint: Path = Path("weights/vae_epoch_100.pt")
     latent_dim: int = 4
+    encode_batch_size: int = 64  # mels per VAE call when pre-encoding latents
 
     # Noise schedule
     timesteps: int = 1000
@@ -75,6 +81,10 @@ class DiffusionConfig:
     gradient_accumulation: int = 2
     use_amp: bool = True
 
+    # torch.compile (CUDA only)
+    compile_model: bool = True
+    compile_mode: str = "reduce-overhead"
+
     # EMA
     ema_decay: float = 0.9999
 
@@ -87,3 +97,12 @@ class DiffusionConfig:
 
     # Logging
     log_dir: Path = Path("runs/diffusion")
+
+
+def config_to_dict(cfg: AutoencoderConfig | DiffusionConfig) -> dict[str, Any]:
+    """Plain-dict form of a config for checkpoints (Paths become strings).
+
+    Lets checkpoints load with ``torch.load(weights_only=True)``, which
+    rejects pickled dataclasses and Path objects.
+    """
+    return {k: str(v) if isinstance(v, Path) else v for k, v in asdict(cfg).items()}
@@ -32,11 +32,12 @@ def vae_loss(
     mu: torch.Tensor,
     logvar: torch.Tensor,
     kl_weight: float = 0.0001,
-) -> tuple[torch.Tensor, dict[str, float]]:
+) -> tuple[torch.Tensor, dict[str, torch.Tensor]]:
     """Combined VAE loss.
 
     Returns:
-        Total loss tensor and dict of individual loss values for logging.
+        Total loss tensor and dict of detached scalar loss tensors for
+        logging. They stay on the device; call ``.item()`` only when needed.
     """
     mse = reconstruction_loss(recon, target)
     spectral = spectral_convergence_loss(recon, target)
@@ -45,10 +46,10 @@ def vae_loss(
     total = mse + spectral + kl_weight * kl
 
     metrics = {
-        "mse": mse.item(),
-        "spectral": spectral.item(),
-        "kl": kl.item(),
-        "kl_weighted": (kl_weight * kl).item(),
-        "total": total.item(),
+        "mse": mse.detach(),
+        "spectral": spectral.detach(),
+        "kl": kl.detach(),
+        "kl_weighted": (kl_weight * kl).detach(),
+        "total": total.detach(),
     }
     return total, metrics
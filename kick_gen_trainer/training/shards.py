@@ -0,0 +1,78 @@
+"""
+Memory-mapped dataset shards.
+
+A shard is one stacked float32 ``{name}.npy`` array (row i = sample i) plus a
+``{name}_stems.json`` index giving each row's source filename stem. Datasets
+open the array with ``mmap_mode="r"`` so reads come from the OS page cache
+instead of opening one small ``.pt`` file per sample.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+def array_path(shard_dir: Path, name: str) -> Path:
+    return shard_dir / f"{name}.npy"
+
+
+def stems_path(shard_dir: Path, name: str) -> Path:
+    return shard_dir / f"{name}_stems.json"
+
+
+def shard_exists(shard_dir: Path, name: str) -> bool:
+    return array_path(shard_dir, name).exists() and stems_path(shard_dir, name).exists()
+
+
+def open_writer(shard_dir: Path, name: str, shape: tuple[int, ...]) -> np.memmap:
+    """Create a writable memory-mapped ``.npy`` of the given (max) shape."""
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    return np.lib.format.open_memmap(
+        array_path(shard_dir, name), mode="w+", dtype=np.float32, shape=shape,
+    )
+
+
+def finalize(shard_dir: Path, name: str, arr: np.memmap, stems: list[str]) -> None:
+    """Flush a shard written with ``open_writer`` and write its stems index.
+
+    Rows past ``len(stems)`` (e.g. files that failed to process) are dropped
+    by rewriting the array at its final size.
+    """
+    arr.flush()
+    n = len(stems)
+    if n < arr.shape[0]:
+        tmp = shard_dir / f"{name}.tmp.npy"
+        out = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=arr.dtype, shape=(n, *arr.shape[1:]),
+        )
+        out[:] = arr[:n]
+        out.flush()
+        del out
+        os.replace(tmp, array_path(shard_dir, name))
+    stems_path(shard_dir, name).write_text(json.dumps(stems))
+
+
+def load_stems(shard_dir: Path, name: str) -> list[str]:
+    """Row-ordered filename stems of a shard."""
+    path = stems_path(shard_dir, name)
+    if not path.exists():
+        raise FileNotFoundError(f"No {name} shard in {shard_dir}")
+    return json.loads(path.read_text())
+
+
+def open_array(shard_dir: Path, name: str) -> np.ndarray:
+    """Open a shard's array read-only and memory-mapped."""
+    return np.load(array_path(shard_dir, name), mmap_mode="r")
+
+
+def array_shape(shard_dir: Path, name: str) -> tuple[int, ...]:
+    """Shape of a shard's array, read from the ``.npy`` header without mapping it."""
+    with open(array_path(shard_dir, name), "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, _ = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, _ = np.lib.format.read_array_header_2_0(f)
+    return shape
@@ -1,38 +1,43 @@
 """Training script for the kick drum VAE."""
 
-import sys
 from pathlib import Path
 
+import numpy as np
 import torch
 from torch.utils.data import DataLoader, Dataset, random_split
 from torch.utils.tensorboard import SummaryWriter
 from tqdm import tqdm
 
-# Add project root to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from models.autoencoder import KickVAE
-from training.config import AutoencoderConfig
+from training import shards
+from training.config import AutoencoderConfig, config_to_dict
 from training.losses import vae_loss
 
 
 class MelDataset(Dataset):
-    """Dataset of preprocessed mel spectrogram tensors."""
+    """Dataset of preprocessed mel spectrograms, held in memory.
+
+    The whole mel shard (~100 MB for a few thousand kicks) is read once into
+    a single tensor, pinned when CUDA is available, so items are plain
+    indexing with no per-sample I/O.
+    """
 
     def __init__(self, data_dir: Path) -> None:
-        self.files = sorted(
-            f for f in data_dir.glob("*.pt") if not f.name.startswith("._")
-        )
-        if not self.files:
+        self.data_dir = data_dir
+        self.stems = shards.load_stems(data_dir, "mels")
+        if not self.stems:
             raise FileNotFoundError(
-                f"No .pt files found in {data_dir}"
+                f"Empty mel shard in {data_dir}"
             )
+        self.data = torch.from_numpy(np.array(shards.open_array(data_dir, "mels")))
+        if torch.cuda.is_available():
+            self.data = self.data.pin_memory()
 
     def __len__(self) -> int:
-        return len(self.files)
+        return len(self.stems)
 
     def __getitem__(self, idx: int) -> torch.Tensor:
-        return torch.load(self.files[idx], weights_only=False)
+        return self.data[idx]
 
 
 def train(cfg: AutoencoderConfig | None = None) -> None:
@@ -46,6 +51,10 @@ def train(cfg: AutoencoderConfig | None = None) -> None:
         else "cpu"
     )
     print(f"Using device: {device}")
+    # Fixed input shapes: let cuDNN pick the fastest (NHWC) conv algorithms
+    torch.backends.cudnn.benchmark = True
+    # TF32 for fp32 matmuls on Ampere+ (cuDNN convs already default to TF32)
+    torch.set_float32_matmul_precision("high")
 
     # Data
     dataset = MelDataset(cfg.data_dir)
@@ -61,20 +70,25 @@ def train(cfg: AutoencoderConfig | None = None) -> None:
         batch_size=cfg.batch_size,
         shuffle=True,
         num_workers=cfg.num_workers,
-        pin_memory=True,
+        pin_memory=False,
     )
     val_loader = DataLoader(
         val_set,
         batch_size=cfg.batch_size,
         shuffle=False,
         num_workers=cfg.num_workers,
-        pin_memory=True,
+        pin_memory=False,
     )
 
     print(f"Train: {train_size}, Val: {val_size}")
 
     # Model
-    model = KickVAE(latent_dim=cfg.latent_dim).to(device)
+    model = KickVAE(latent_dim=cfg.latent_dim).to(device, memory_format=torch.channels_last)
+    # Compiled view for the training step; checkpoints save the plain module
+    # so state_dict keys stay loadable by inference
+    train_model = model
+    if cfg.compile_model and device.type == "cuda":
+        train_model = torch.compile(model, mode=cfg.compile_mode, dynamic=False)
     optimizer = torch.optim.AdamW(model.parameters(), lr=cfg.learning_rate)
     scaler = torch.amp.GradScaler(enabled=cfg.use_amp and device.type == "cuda")
 
@@ -89,63 +103,67 @@ def train(cfg: AutoencoderConfig | None = None) -> None:
         model.train()
         kl_weight = cfg.kl_weight_at_epoch(epoch)
 
-        epoch_metrics: dict[str, float] = {}
+        # Summed on-device; read back once per epoch to avoid per-step syncs
+        epoch_metrics: dict[str, torch.Tensor] = {}
         epoch_count = 0
 
         pbar = tqdm(train_loader, desc=f"Epoch {epoch+1}/{cfg.epochs}")
         for batch in pbar:
-            batch = batch.to(device)
+            batch = batch.to(device, memory_format=torch.channels_last)
+            optimizer.zero_grad(set_to_none=True)
 
             with torch.amp.autocast(
                 device_type=device.type,
                 enabled=cfg.use_amp and device.type == "cuda",
             ):
-                recon, mu, logvar = model(batch)
+                recon, mu, logvar = train_model(batch)
                 loss, metrics = vae_loss(
                     recon, batch, mu, logvar, kl_weight
                 )
 
-            optimizer.zero_grad()
             scaler.scale(loss).backward()
             scaler.step(optimizer)
             scaler.update()
 
             # Accumulate metrics
             for k, v in metrics.items():
-                epoch_metrics[k] = epoch_metrics.get(k, 0.0) + v
+                epoch_metrics[k] = epoch_metrics[k] + v if k in epoch_metrics else v
             epoch_count += 1
             global_step += 1
 
-            pbar.set_postfix(loss=f"{metrics['total']:.4f}")
+            if global_step % 50 == 0:
+                pbar.set_postfix(loss=f"{metrics['total'].item():.4f}")
 
         # Log epoch averages
-        for k, v in epoch_metrics.items():
+        epoch_totals = {k: v.item() for k, v in epoch_metrics.items()}
+        for k, v in epoch_totals.items():
             writer.add_scalar(f"train/{k}", v / epoch_count, epoch)
         writer.add_scalar("train/kl_weight", kl_weight, epoch)
 
         # Validation
         model.eval()
-        val_metrics: dict[str, float] = {}
+        val_metrics: dict[str, torch.Tensor] = {}
         val_count = 0
 
         with torch.no_grad():
             for batch in val_loader:
-                batch = batch.to(device)
+                batch = batch.to(device, memory_format=torch.channels_last)
                 recon, mu, logvar = model(batch)
                 _, metrics = vae_loss(
                     recon, batch, mu, logvar, kl_weight
                 )
                 for k, v in metrics.items():
-                    val_metrics[k] = val_metrics.get(k, 0.0) + v
+                    val_metrics[k] = val_metrics[k] + v if k in val_metrics else v
                 val_count += 1
 
-        avg_val_loss = val_metrics.get("total", 0.0) / max(val_count, 1)
-        for k, v in val_metrics.items():
+        val_totals = {k: v.item() for k, v in val_metrics.items()}
+        avg_val_loss = val_totals.get("total", 0.0) / max(val_count, 1)
+        for k, v in val_totals.items():
             writer.add_scalar(f"val/{k}", v / val_count, epoch)
 
         print(
             f"Epoch {epoch+1}: "
-            f"train={epoch_metrics['total']/epoch_count:.4f} "
+            f"train={epoch_totals['total']/epoch_count:.4f} "
             f"val={avg_val_loss:.4f} "
             f"kl_w={kl_weight:.6f}"
         )
@@ -157,7 +175,7 @@ def train(cfg: AutoencoderConfig | None = None) -> None:
                 "epoch": epoch + 1,
                 "model_state_dict": model.state_dict(),
                 "optimizer_state_dict": optimizer.state_dict(),
-                "config": cfg,
+                "config": config_to_dict(cfg),
             }, path)
             print(f"Saved checkpoint: {path}")
 
@@ -1,21 +1,20 @@
 """Training script for the latent diffusion model."""
 
-import copy
-import csv
-import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import torch
 from torch.utils.data import DataLoader, Dataset, random_split
 from torch.utils.tensorboard import SummaryWriter
 from tqdm import tqdm
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from models.autoencoder import KickVAE
 from models.diffusion import LatentUNet, NoiseScheduler
-from models.text_encoder import KeywordEncoder, build_vocab
-from training.config import DiffusionConfig
+from models.precision import native_bf16
+from models.text_encoder import KeywordEncoder, load_metadata
+from training import shards
+from training.config import DiffusionConfig, config_to_dict
 
 
 # ---------------------------------------------------------------------------
@@ -28,38 +27,27 @@ class LatentDataset(Dataset):
     def __init__(
         self,
         latents_dir: Path,
-        metadata_csv: Path,
-        vocab: list[str],
+        keywords: dict[str, list[int]],
     ) -> None:
-        self.latent_files = sorted(
-            f for f in latents_dir.glob("*.pt") if not f.name.startswith("._")
-        )
-        if not self.latent_files:
-            raise FileNotFoundError(f"No .pt files in {latents_dir}")
-
-        # Build keyword lookup: filename_stem -> list of keyword strings
-        self.kw_to_idx = {kw: i for i, kw in enumerate(vocab)}
-        self.keywords: dict[str, list[int]] = {}
-        with open(metadata_csv) as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                stem = Path(row["filename"]).stem
-                ids = []
-                for kw in row["keywords"].split(","):
-                    kw = kw.strip().lower()
-                    if kw in self.kw_to_idx:
-                        ids.append(self.kw_to_idx[kw])
-                self.keywords[stem] = ids
+        self.latents_dir = latents_dir
+        self.stems = shards.load_stems(latents_dir, "latents")
+        if not self.stems:
+            raise FileNotFoundError(f"Empty latent shard in {latents_dir}")
+
+        # Keyword lookup: filename_stem -> list of token ids (see load_metadata)
+        self.keywords = keywords
+        # Opened lazily so each DataLoader worker maps the file itself
+        self._latents: np.ndarray | None = None
 
     def __len__(self) -> int:
-        return len(self.latent_files)
+        return len(self.stems)
 
     def __getitem__(self, idx: int) -> tuple[torch.Tensor, list[int]]:
-        path = self.latent_files[idx]
-        latent = torch.load(path, weights_only=False)
-        # latent filename matches mel filename stem
-        stem = path.stem
-        token_ids = self.keywords.get(stem, [])
+        if self._latents is None:
+            self._latents = shards.open_array(self.latents_dir, "latents")
+        latent = torch.from_numpy(np.array(self._latents[idx]))
+        # latent rows share the mel shard's stems
+        token_ids = self.keywords.get(self.stems[idx], [])
         return latent, token_ids
 
 
@@ -72,19 +60,58 @@ def collate_fn(
     return latents, token_ids
 
 
+class CudaPrefetcher:
+    """Iterate a DataLoader, copying the next batch to the GPU on a side stream.
+
+    The host-to-device copy of batch i+1 overlaps the compute of batch i.
+    The loader must use pin_memory=True for the copy to be asynchronous.
+    """
+
+    def __init__(self, loader: DataLoader, device: torch.device) -> None:
+        self.loader = loader
+        self.device = device
+        self.stream = torch.cuda.Stream(device)
+
+    def __len__(self) -> int:
+        return len(self.loader)
+
+    def __iter__(self):
+        batches = iter(self.loader)
+        nxt = self._preload(batches)
+        while nxt is not None:
+            compute = torch.cuda.current_stream(self.device)
+            compute.wait_stream(self.stream)
+            latents, token_ids = nxt
+            # Allocated on the copy stream; keep it alive for compute use
+            latents.record_stream(compute)
+            nxt = self._preload(batches)
+            yield latents, token_ids
+
+    def _preload(self, batches) -> tuple[torch.Tensor, list[list[int]]] | None:
+        try:
+            latents, token_ids = next(batches)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(self.stream):
+            latents = latents.to(
+                self.device, memory_format=torch.channels_last, non_blocking=True,
+            )
+        return latents, token_ids
+
+
 # ---------------------------------------------------------------------------
 # Pre-encode latents
 # ---------------------------------------------------------------------------
 
 def pre_encode_latents(cfg: DiffusionConfig) -> None:
     """Encode all mel spectrograms to latents using frozen VAE."""
-    cfg.latents_dir.mkdir(parents=True, exist_ok=True)
+    mel_stems = shards.load_stems(cfg.data_dir, "mels")
 
     # Check if already done
-    existing = list(cfg.latents_dir.glob("*.pt"))
-    if len(existing) > 100:
-        print(f"Latents dir already has {len(existing)} files, skipping encoding.")
-        return
+    if shards.shard_exists(cfg.latents_dir, "latents"):
+        if shards.load_stems(cfg.latents_dir, "latents") == mel_stems:
+            print(f"Latent shard already has {len(mel_stems)} rows, skipping encoding.")
+            return
 
     device = torch.device(
         "cuda" if torch.cuda.is_available()
@@ -98,20 +125,35 @@ def pre_encode_latents(cfg: DiffusionConfig) -> None:
     vae.load_state_dict(checkpoint["model_state_dict"])
     vae.eval()
 
-    mel_files = sorted(
-        f for f in cfg.data_dir.glob("*.pt") if not f.name.startswith("._")
+    mels = shards.open_array(cfg.data_dir, "mels")
+    print(f"Encoding {len(mel_stems)} mel spectrograms to latents...")
+
+    # Latent grid is the mel grid downsampled 4x by stride-2 convs
+    h, w = mels.shape[2], mels.shape[3]
+    for _ in range(4):
+        h, w = (h + 1) // 2, (w + 1) // 2
+    latents = shards.open_writer(
+        cfg.latents_dir, "latents", (len(mel_stems), cfg.latent_dim, h, w),
     )
-    print(f"Encoding {len(mel_files)} mel spectrograms to latents...")
 
-    with torch.no_grad():
-        for f in tqdm(mel_files):
-            out_path = cfg.latents_dir / f.name
-            if out_path.exists():
-                continue
-            mel = torch.load(f, weights_only=False).unsqueeze(0).to(device)
-            latent = vae.encode(mel).squeeze(0).cpu()
-            torch.save(latent, out_path)
+    n, bs = len(mel_stems), cfg.encode_batch_size
+
+    def load_chunk(start: int) -> torch.Tensor:
+        chunk = torch.from_numpy(np.array(mels[start:start + bs]))
+        return chunk.pin_memory() if device.type == "cuda" else chunk
 
+    # Read the next chunk from the memmap while the current one encodes
+    with torch.no_grad(), ThreadPoolExecutor(max_workers=1) as io_pool:
+        pending = io_pool.submit(load_chunk, 0)
+        for start in tqdm(range(0, n, bs)):
+            chunk = pending.result()
+            if start + bs < n:
+                pending = io_pool.submit(load_chunk, start + bs)
+            with torch.autocast(device_type=device.type, enabled=device.type == "cuda"):
+                encoded = vae.encode(chunk.to(device, non_blocking=True))
+            latents[start:start + len(chunk)] = encoded.float().cpu().numpy()
+
+    shards.finalize(cfg.latents_dir, "latents", latents, mel_stems)
     print("Latent encoding complete.")
 
 
@@ -120,19 +162,31 @@ def pre_encode_latents(cfg: DiffusionConfig) -> None:
 # ---------------------------------------------------------------------------
 
 class EMA:
-    """Exponential moving average of model parameters."""
+    """Exponential moving average of model parameters.
+
+    Holds detached copies of the parameter tensors only (no module copy) and
+    updates them all with one fused foreach lerp per step. The optimizer
+    updates parameters in place, so the source tensor list is built once.
+    """
 
     def __init__(self, model: torch.nn.Module, decay: float = 0.9999) -> None:
         self.decay = decay
-        self.shadow = copy.deepcopy(model)
-        self.shadow.eval()
-        for p in self.shadow.parameters():
-            p.requires_grad_(False)
+        self.param_names: list[str] = []
+        self.model_params: list[torch.Tensor] = []
+        self.shadow_params: list[torch.Tensor] = []
+        for name, p in model.named_parameters():
+            self.param_names.append(name)
+            self.model_params.append(p.detach())
+            self.shadow_params.append(p.detach().clone())
 
     @torch.no_grad()
-    def update(self, model: torch.nn.Module) -> None:
-        for s, p in zip(self.shadow.parameters(), model.parameters()):
-            s.data.mul_(self.decay).add_(p.data, alpha=1 - self.decay)
+    def update(self) -> None:
+        # shadow += (1 - decay) * (param - shadow)
+        torch._foreach_lerp_(self.shadow_params, self.model_params, 1 - self.decay)
+
+    def state_dict(self) -> dict[str, torch.Tensor]:
+        """Shadow weights keyed like ``model.state_dict()`` (LatentUNet has no buffers)."""
+        return dict(zip(self.param_names, self.shadow_params))
 
 
 # ---------------------------------------------------------------------------
@@ -152,12 +206,16 @@ def train(cfg: DiffusionConfig | None = None) -> None:
         else "cpu"
     )
     print(f"Using device: {device}")
+    # Fixed input shapes: let cuDNN pick the fastest (NHWC) conv algorithms
+    torch.backends.cudnn.benchmark = True
+    # TF32 for fp32 matmuls on Ampere+ (cuDNN convs already default to TF32)
+    torch.set_float32_matmul_precision("high")
 
     # Build vocab and dataset
-    vocab = build_vocab(cfg.metadata_csv)
+    vocab, stem_to_ids = load_metadata(cfg.metadata_csv)
     print(f"Vocabulary size: {len(vocab)}")
 
-    dataset = LatentDataset(cfg.latents_dir, cfg.metadata_csv, vocab)
+    dataset = LatentDataset(cfg.latents_dir, stem_to_ids)
     val_size = int(len(dataset) * cfg.val_split)
     train_size = len(dataset) - val_size
     train_set, val_set = random_split(
@@ -188,7 +246,7 @@ def train(cfg: DiffusionConfig | None = None) -> None:
         latent_dim=cfg.latent_dim,
         base_channels=cfg.base_channels,
         cond_dim=cfg.cond_dim,
-    ).to(device)
+    ).to(device, memory_format=torch.channels_last)
     text_enc = KeywordEncoder(
         vocab_size=len(vocab),
         embed_dim=cfg.text_embed_dim,
@@ -198,17 +256,43 @@ def train(cfg: DiffusionConfig | None = None) -> None:
     scheduler = NoiseScheduler(cfg.timesteps, cfg.beta_start, cfg.beta_end).to(device)
     ema = EMA(model, cfg.ema_decay)
 
+    # Compiled view of the U-Net for the training step; checkpoints save the
+    # plain module so state_dict keys stay loadable by inference. The text
+    # encoder takes variable-length Python lists, so it stays eager.
+    train_model = model
+    if cfg.compile_model and device.type == "cuda":
+        train_model = torch.compile(model, mode=cfg.compile_mode, dynamic=False)
+
     optimizer = torch.optim.AdamW(
         list(model.parameters()) + list(text_enc.parameters()),
         lr=cfg.learning_rate,
     )
-    scaler = torch.amp.GradScaler(enabled=cfg.use_amp and device.type == "cuda")
+    use_amp = cfg.use_amp and device.type == "cuda"
+    # bf16 keeps fp32's exponent range, so Ampere+ GPUs train without loss
+    # scaling; the scaler below is then a pass-through. Older GPUs only
+    # emulate bf16, so they use fp16 with the scaler
+    amp_dtype = torch.bfloat16 if use_amp and native_bf16(device) else torch.float16
+    scaler = torch.amp.GradScaler(enabled=use_amp and amp_dtype == torch.float16)
 
     # Logging
     cfg.log_dir.mkdir(parents=True, exist_ok=True)
     cfg.checkpoint_dir.mkdir(parents=True, exist_ok=True)
     writer = SummaryWriter(cfg.log_dir)
 
+    # CFG dropout coin flips: a CPU buffer of uniforms consumed batch_size at
+    # a time and refilled in one call when exhausted, no device round-trip
+    cfg_dropout_gen = torch.Generator().manual_seed(0)
+    coin = torch.rand(8192, generator=cfg_dropout_gen)
+    coin_idx = 0
+
+    # Noise is refilled in place each step instead of allocating a new tensor.
+    # Sized from the shard header: indexing the dataset would map the latents
+    # in this process before the DataLoader workers fork
+    latent_shape = shards.array_shape(cfg.latents_dir, "latents")[1:]
+    noise_buf = torch.empty(
+        cfg.batch_size, *latent_shape, device=device,
+    ).to(memory_format=torch.channels_last)
+
     # Training loop (iteration-based)
     global_step = 0
     model.train()
@@ -216,33 +300,40 @@ def train(cfg: DiffusionConfig | None = None) -> None:
 
     print(f"Training for {cfg.iterations} iterations...")
 
+    # On CUDA the next batch's copy overlaps the current step
+    train_batches = (
+        CudaPrefetcher(train_loader, device) if device.type == "cuda" else train_loader
+    )
+
     while global_step < cfg.iterations:
-        for latents, token_ids in train_loader:
+        for latents, token_ids in train_batches:
             if global_step >= cfg.iterations:
                 break
 
-            latents = latents.to(device)
+            # No-op when prefetched; noisy inherits channels_last from latents
+            latents = latents.to(device, memory_format=torch.channels_last)
             batch_size = latents.shape[0]
 
             # Classifier-free guidance dropout: replace keywords with empty list
-            dropped_ids = []
-            for ids in token_ids:
-                if torch.rand(1).item() < cfg.cfg_dropout:
-                    dropped_ids.append([])
-                else:
-                    dropped_ids.append(ids)
+            if coin_idx + batch_size > coin.numel():
+                coin.uniform_(generator=cfg_dropout_gen)
+                coin_idx = 0
+            drop = coin[coin_idx:coin_idx + batch_size].lt(cfg.cfg_dropout).tolist()
+            coin_idx += batch_size
+            dropped_ids = [[] if d else ids for d, ids in zip(drop, token_ids)]
 
             # Sample timesteps and noise
             t = torch.randint(0, cfg.timesteps, (batch_size,), device=device)
-            noise = torch.randn_like(latents)
+            noise = noise_buf[:batch_size].normal_()
             noisy = scheduler.add_noise(latents, noise, t)
 
             with torch.amp.autocast(
                 device_type=device.type,
-                enabled=cfg.use_amp and device.type == "cuda",
+                dtype=amp_dtype,
+                enabled=use_amp,
             ):
                 cond = text_enc(dropped_ids, device)
-                pred_noise = model(noisy, t, cond)
+                pred_noise = train_model(noisy, t, cond)
                 loss = torch.nn.functional.mse_loss(pred_noise, noise)
                 loss = loss / cfg.gradient_accumulation
 
@@ -251,8 +342,8 @@ def train(cfg: DiffusionConfig | None = None) -> None:
             if (global_step + 1) % cfg.gradient_accumulation == 0:
                 scaler.step(optimizer)
                 scaler.update()
-                optimizer.zero_grad()
-                ema.update(model)
+                optimizer.zero_grad(set_to_none=True)
+                ema.update()
 
             # Logging
             if global_step % 50 == 0:
@@ -274,11 +365,11 @@ def train(cfg: DiffusionConfig | None = None) -> None:
                 val_count = 0
                 with torch.no_grad():
                     for vl, vt in val_loader:
-                        vl = vl.to(device)
+                        vl = vl.to(device, memory_format=torch.channels_last)
                         vt_step = torch.randint(
                             0, cfg.timesteps, (vl.shape[0],), device=device
                         )
-                        vn = torch.randn_like(vl)
+                        vn = noise_buf[:vl.shape[0]].normal_()
                         vnoisy = scheduler.add_noise(vl, vn, vt_step)
                         vcond = text_enc(vt, device)
                         vpred = model(vnoisy, vt_step, vcond)
@@ -296,11 +387,11 @@ def train(cfg: DiffusionConfig | None = None) -> None:
                 torch.save({
                     "step": global_step + 1,
                     "model_state_dict": model.state_dict(),
-                    "ema_state_dict": ema.shadow.state_dict(),
+                    "ema_state_dict": ema.state_dict(),
                     "text_enc_state_dict": text_enc.state_dict(),
                     "optimizer_state_dict": optimizer.state_dict(),
                     "vocab": vocab,
-                    "config": cfg,
+                    "config": config_to_dict(cfg),
                 }, path)
                 print(f"Saved checkpoint: {path}")
 
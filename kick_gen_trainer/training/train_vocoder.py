@@ -2,7 +2,7 @@
 HiFi-GAN vocoder training.
 
 Trains a mel-to-waveform generator with multi-period and multi-scale discriminators.
-Designed for 6GB VRAM: lazy-loads audio, uses random 8192-sample segments, small batch size.
+Designed for 6GB VRAM: memory-mapped audio/mel shards, random 8192-sample segments, small batch size.
 
 Usage:
     uv run training/train_vocoder.py
@@ -10,20 +10,26 @@ Usage:
 """
 
 import argparse
-import sys
+import json
+import os
+import random
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
 
 import numpy as np
 import soundfile as sf
 import torch
 import torch.nn.functional as F
+import torchaudio
 from torch.utils.data import Dataset, DataLoader
 from torch.utils.tensorboard import SummaryWriter
 from tqdm import tqdm
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from models.vocoder import HiFiGANGenerator, MultiPeriodDiscriminator, MultiScaleDiscriminator
+from models.precision import native_bf16
+from models.vocoder import GENERATORS, MultiPeriodDiscriminator, MultiScaleDiscriminator
+from training import shards
 
 # Audio params (must match preprocess.py)
 SAMPLE_RATE = 44100
@@ -33,16 +39,31 @@ N_MELS = 128
 DURATION_SECONDS = 2.0
 TARGET_SAMPLES = int(SAMPLE_RATE * DURATION_SECONDS)
 
+# Polyphase windowed-sinc resamplers (same as preprocess.py), one per source rate
+_RESAMPLERS: dict[int, torchaudio.transforms.Resample] = {}
+
+
+def get_resampler(sr: int) -> torchaudio.transforms.Resample:
+    """Resampler from sr to SAMPLE_RATE, cached per source rate."""
+    resampler = _RESAMPLERS.get(sr)
+    if resampler is None:
+        resampler = torchaudio.transforms.Resample(sr, SAMPLE_RATE)
+        _RESAMPLERS[sr] = resampler
+    return resampler
+
 
 # ---------------------------------------------------------------------------
-# Dataset - lazy loads audio, pairs with pre-computed mel
+# Dataset - raw audio shard paired with pre-computed mel shard
 # ---------------------------------------------------------------------------
 
 class VocoderDataset(Dataset):
-    """Lazy-loading dataset that pairs raw audio with processed mel spectrograms.
+    """Dataset that pairs raw audio with processed mel spectrograms.
 
-    Only stores file paths in memory. Loads audio on-the-fly per __getitem__.
-    Returns random segments of `segment_size` samples for memory efficiency.
+    On first use the paired raw files are decoded, resampled and padded once
+    into an ``audio`` shard next to the mel shard (see training/shards.py);
+    later runs reuse it while the set of paired files is unchanged.
+    __getitem__ only slices random `segment_size` segments out of the
+    memory-mapped shards.
     """
 
     def __init__(self, raw_dir: Path, processed_dir: Path, segment_size: int = 8192) -> None:
@@ -50,58 +71,100 @@ class VocoderDataset(Dataset):
         self.raw_dir = raw_dir
         self.processed_dir = processed_dir
 
-        # Build list of (raw_path, mel_path) pairs
-        self.pairs: list[tuple[Path, Path]] = []
-        mel_stems = {p.stem for p in processed_dir.glob("*.pt")}
-        for raw_path in sorted(raw_dir.iterdir()):
-            if raw_path.suffix.lower() not in (".wav", ".aif", ".aiff", ".mp3", ".flac"):
-                continue
-            stem = raw_path.stem
-            if stem in mel_stems:
-                self.pairs.append((raw_path, processed_dir / f"{stem}.pt"))
+        self.pairs = self._load_pairs()
+        # All mels share the shard's frame count; read it once from the header
+        self.mel_total_frames = shards.open_array(processed_dir, "mels").shape[-1]
+
+        # Audio shard rows follow self.pairs
+        stems = [raw_path.stem for raw_path, _ in self.pairs]
+        if not (
+            shards.shard_exists(processed_dir, "audio")
+            and shards.load_stems(processed_dir, "audio") == stems
+        ):
+            self._build_audio_shard(stems)
+
+        # Opened lazily so each DataLoader worker maps the files itself
+        self._audio: np.ndarray | None = None
+        self._mels: np.ndarray | None = None
 
         print(f"VocoderDataset: {len(self.pairs)} paired samples found")
 
+    def _load_pairs(self) -> list[tuple[Path, int]]:
+        """(raw_path, mel shard row) pairs, cached in ``vocoder_index.json``.
+
+        The cached index is reused while the raw directory listing and the
+        mel stems index are unchanged (compared by mtime), skipping the scan.
+        """
+        mel_stems_path = shards.stems_path(self.processed_dir, "mels")
+        if not mel_stems_path.exists():
+            raise FileNotFoundError(f"No mels shard in {self.processed_dir}")
+        index_path = self.processed_dir / "vocoder_index.json"
+        key = [
+            str(self.raw_dir.resolve()),
+            os.stat(self.raw_dir).st_mtime_ns,
+            mel_stems_path.stat().st_mtime_ns,
+        ]
+        if index_path.exists():
+            index = json.loads(index_path.read_text())
+            if index["key"] == key:
+                return [(self.raw_dir / name, row) for name, row in index["pairs"]]
+
+        pairs: list[tuple[Path, int]] = []
+        mel_rows = {stem: i for i, stem in enumerate(shards.load_stems(self.processed_dir, "mels"))}
+        # scandir entries carry their names, so only matches become Paths
+        for entry in sorted(os.scandir(self.raw_dir), key=lambda e: e.name):
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() not in (".wav", ".aif", ".aiff", ".mp3", ".flac"):
+                continue
+            if stem in mel_rows and not entry.name.startswith("._"):
+                pairs.append((Path(entry.path), mel_rows[stem]))
+
+        index_path.write_text(json.dumps({
+            "key": key,
+            "pairs": [[raw_path.name, row] for raw_path, row in pairs],
+        }))
+        return pairs
+
+    def _build_audio_shard(self, stems: list[str]) -> None:
+        """Decode every paired file to mono 44.1kHz, 2s float32 rows."""
+        audio = shards.open_writer(self.processed_dir, "audio", (len(self.pairs), TARGET_SAMPLES))
+        for i, (raw_path, _) in enumerate(tqdm(self.pairs, desc="Caching audio")):
+            wav, sr = sf.read(raw_path, dtype="float32", always_2d=True)
+            wav = torch.from_numpy(np.ascontiguousarray(wav[:, 0]))  # mono
+            if sr != SAMPLE_RATE:
+                wav = get_resampler(sr)(wav)
+            # Pad/trim to target length
+            n = min(len(wav), TARGET_SAMPLES)
+            audio[i, :n] = wav[:n].numpy()
+            audio[i, n:] = 0.0
+        shards.finalize(self.processed_dir, "audio", audio, stems)
+
     def __len__(self) -> int:
         return len(self.pairs)
 
     def __getitem__(self, idx: int) -> tuple[torch.Tensor, torch.Tensor]:
-        raw_path, mel_path = self.pairs[idx]
-
-        # Load raw audio
-        audio, sr = sf.read(raw_path, dtype="float32", always_2d=True)
-        audio = audio[:, 0]  # mono
-        if sr != SAMPLE_RATE:
-            # Simple resample via linear interpolation
-            audio = np.interp(
-                np.linspace(0, len(audio) - 1, int(len(audio) * SAMPLE_RATE / sr)),
-                np.arange(len(audio)),
-                audio,
-            ).astype(np.float32)
-
-        # Pad/trim to target length
-        if len(audio) < TARGET_SAMPLES:
-            audio = np.pad(audio, (0, TARGET_SAMPLES - len(audio)))
-        else:
-            audio = audio[:TARGET_SAMPLES]
-
-        # Load pre-computed mel
-        mel = torch.load(mel_path, weights_only=True)  # (1, 128, 173)
+        _, mel_row = self.pairs[idx]
+        if self._audio is None:
+            self._audio = shards.open_array(self.processed_dir, "audio")
+            self._mels = shards.open_array(self.processed_dir, "mels")
 
         # Pick random segment
         # segment_size audio samples = segment_size // HOP_LENGTH mel frames
         mel_frames = self.segment_size // HOP_LENGTH
-        max_mel_start = mel.shape[-1] - mel_frames
+        max_mel_start = self.mel_total_frames - mel_frames
         if max_mel_start > 0:
-            mel_start = torch.randint(0, max_mel_start, (1,)).item()
+            # Python's RNG: no 1-element tensor per sample. DataLoader seeds
+            # it per worker, so workers don't draw identical offsets
+            mel_start = random.randrange(max_mel_start)
         else:
             mel_start = 0
 
         audio_start = mel_start * HOP_LENGTH
         audio_end = audio_start + self.segment_size
 
-        mel_seg = mel[:, :, mel_start:mel_start + mel_frames]  # (1, 128, mel_frames)
-        audio_seg = torch.from_numpy(audio[audio_start:audio_end])  # (segment_size,)
+        # (128, mel_frames), (segment_size,)
+        mel_seg = torch.from_numpy(np.array(self._mels[mel_row, 0, :, mel_start:mel_start + mel_frames]))
+        audio_seg = torch.from_numpy(np.array(self._audio[idx, audio_start:audio_end]))
 
         # Pad if needed (edge cases)
         if mel_seg.shape[-1] < mel_frames:
@@ -109,7 +172,7 @@ class VocoderDataset(Dataset):
         if audio_seg.shape[-1] < self.segment_size:
             audio_seg = F.pad(audio_seg, (0, self.segment_size - audio_seg.shape[-1]))
 
-        return mel_seg.squeeze(0), audio_seg.unsqueeze(0)  # (128, mel_frames), (1, segment_size)
+        return mel_seg, audio_seg.unsqueeze(0)  # (128, mel_frames), (1, segment_size)
 
 
 # ---------------------------------------------------------------------------
@@ -138,31 +201,84 @@ def feature_matching_loss(real_fmaps: list[list[torch.Tensor]], fake_fmaps: list
     return loss
 
 
+# Magnitude mel transform for the loss, built once per device
+_MEL_LOSS_TRANSFORMS: dict[torch.device, torchaudio.transforms.MelSpectrogram] = {}
+
+
+def get_loss_mel_transform(device: torch.device) -> torchaudio.transforms.MelSpectrogram:
+    mel_spec = _MEL_LOSS_TRANSFORMS.get(device)
+    if mel_spec is None:
+        mel_spec = torchaudio.transforms.MelSpectrogram(
+            sample_rate=SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH,
+            n_mels=N_MELS, power=1.0,
+        ).to(device)
+        _MEL_LOSS_TRANSFORMS[device] = mel_spec
+    return mel_spec
+
+
 def mel_spectrogram_loss(y: torch.Tensor, y_hat: torch.Tensor) -> torch.Tensor:
     """L1 loss on mel spectrograms of real vs generated audio."""
-    mel_transform = torch.nn.Sequential(
-        torch.nn.Identity(),  # placeholder
-    )
-    # Compute mel on-the-fly for loss
-    # Use torchaudio for consistency
-    import torchaudio
-    mel_spec = torchaudio.transforms.MelSpectrogram(
-        sample_rate=SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH,
-        n_mels=N_MELS, power=1.0,
-    ).to(y.device)
-
-    mel_real = torch.log(mel_spec(y.squeeze(1)).clamp(min=1e-5))
-    mel_fake = torch.log(mel_spec(y_hat.squeeze(1)).clamp(min=1e-5))
+    mel_spec = get_loss_mel_transform(y.device)
+    # STFT + log in fp32 even when called from an autocast region
+    with torch.autocast(device_type=y.device.type, enabled=False):
+        mel_real = torch.log(mel_spec(y.squeeze(1).float()).clamp(min=1e-5))
+        mel_fake = torch.log(mel_spec(y_hat.squeeze(1).float()).clamp(min=1e-5))
     return F.l1_loss(mel_real, mel_fake)
 
 
+# ---------------------------------------------------------------------------
+# Checkpointing
+# ---------------------------------------------------------------------------
+
+def to_cpu(obj: Any) -> Any:
+    """Copy every tensor in a nested state dict to CPU (always a fresh copy)."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", non_blocking=True, copy=True)
+    if isinstance(obj, dict):
+        return {k: to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(to_cpu(v) for v in obj)
+    return obj
+
+
+def save_checkpoint(state: dict, paths: list[Path]) -> None:
+    """Serialize once, then copy the file to any further paths."""
+    torch.save(state, paths[0])
+    for path in paths[1:]:
+        shutil.copyfile(paths[0], path)
+    for path in paths:
+        print(f"Saved {path}")
+
+
 # ---------------------------------------------------------------------------
 # Training loop
 # ---------------------------------------------------------------------------
 
+def discriminate(
+    disc: torch.nn.Module, real: torch.Tensor, fake: torch.Tensor,
+) -> tuple[list[torch.Tensor], list[torch.Tensor], list[list[torch.Tensor]], list[list[torch.Tensor]]]:
+    """Run a discriminator once over real and fake audio stacked on the batch dim.
+
+    Returns:
+        (real_outputs, fake_outputs, real_fmaps, fake_fmaps), split back per half.
+    """
+    b = real.shape[0]
+    outs, fmaps = disc(torch.cat([real, fake]))
+    return (
+        [o[:b] for o in outs],
+        [o[b:] for o in outs],
+        [[f[:b] for f in fmap] for fmap in fmaps],
+        [[f[b:] for f in fmap] for fmap in fmaps],
+    )
+
+
 def train(args: argparse.Namespace) -> None:
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print(f"Device: {device}")
+    # Fixed shapes (drop_last + fixed segment size): autotune conv algorithms
+    # once; TF32 for fp32 matmuls on Ampere+ (cuDNN convs already default to TF32)
+    torch.backends.cudnn.benchmark = True
+    torch.set_float32_matmul_precision("high")
 
     if device.type == "cuda":
         vram_gb = torch.cuda.get_device_properties(0).total_memory / 1e9
@@ -182,10 +298,14 @@ def train(args: argparse.Namespace) -> None:
         pin_memory=True,
         drop_last=True,
         persistent_workers=args.num_workers > 0,
+        # Batches queued ahead per worker; returns flatten out past ~4
+        prefetch_factor=4 if args.num_workers > 0 else None,
     )
 
     # Models
-    generator = HiFiGANGenerator(in_channels=N_MELS).to(device)
+    generator_kwargs = {"depthwise": args.depthwise}
+    generator = GENERATORS[args.generator](in_channels=N_MELS, **generator_kwargs).to(device)
+    # MPD's Conv2d weights are channels_last (set in PeriodDiscriminator)
     mpd = MultiPeriodDiscriminator().to(device)
     msd = MultiScaleDiscriminator().to(device)
 
@@ -194,6 +314,15 @@ def train(args: argparse.Namespace) -> None:
     d_params = (sum(p.numel() for p in mpd.parameters()) + sum(p.numel() for p in msd.parameters())) / 1e6
     print(f"Generator: {g_params:.1f}M params | Discriminators: {d_params:.1f}M params")
 
+    # Compiled views for the training step; checkpoints save the plain modules
+    # so state_dict keys stay loadable. No CUDA graphs: each discriminator runs
+    # twice per step (D and G) and graph replay would overwrite live outputs.
+    train_gen, train_mpd, train_msd = generator, mpd, msd
+    if args.compile and device.type == "cuda":
+        train_gen = torch.compile(generator, dynamic=False)
+        train_mpd = torch.compile(mpd, dynamic=False)
+        train_msd = torch.compile(msd, dynamic=False)
+
     # Optimizers
     optim_g = torch.optim.AdamW(generator.parameters(), lr=args.lr, betas=(0.8, 0.99))
     optim_d = torch.optim.AdamW(
@@ -205,6 +334,13 @@ def train(args: argparse.Namespace) -> None:
     sched_g = torch.optim.lr_scheduler.ExponentialLR(optim_g, gamma=0.999)
     sched_d = torch.optim.lr_scheduler.ExponentialLR(optim_d, gamma=0.999)
 
+    # Mixed precision: bf16 on GPUs with native bf16 (no loss scaling
+    # needed), else fp16 with one GradScaler per optimizer
+    use_amp = args.use_amp and device.type == "cuda"
+    amp_dtype = torch.bfloat16 if use_amp and native_bf16(device) else torch.float16
+    scaler_g = torch.amp.GradScaler(enabled=use_amp and amp_dtype == torch.float16)
+    scaler_d = torch.amp.GradScaler(enabled=use_amp and amp_dtype == torch.float16)
+
     # Checkpointing - resume if exists
     checkpoint_dir = Path(args.checkpoint_dir)
     checkpoint_dir.mkdir(parents=True, exist_ok=True)
@@ -221,9 +357,16 @@ def train(args: argparse.Namespace) -> None:
         optim_d.load_state_dict(ckpt["optim_d"])
         sched_g.load_state_dict(ckpt["sched_g"])
         sched_d.load_state_dict(ckpt["sched_d"])
+        if "scaler_g" in ckpt:
+            scaler_g.load_state_dict(ckpt["scaler_g"])
+            scaler_d.load_state_dict(ckpt["scaler_d"])
         start_epoch = ckpt["epoch"] + 1
         print(f"Resumed at epoch {start_epoch}")
 
+    # Epoch checkpoints are written in the background while training continues
+    ckpt_pool = ThreadPoolExecutor(max_workers=1)
+    pending_save: Future | None = None
+
     # Logging
     log_dir = Path(args.log_dir)
     log_dir.mkdir(parents=True, exist_ok=True)
@@ -238,48 +381,46 @@ def train(args: argparse.Namespace) -> None:
 
         pbar = tqdm(loader, desc=f"Epoch {epoch+1}/{args.epochs}")
         for mel, audio in pbar:
-            mel = mel.to(device)       # (B, 128, mel_frames)
-            audio = audio.to(device)   # (B, 1, segment_size)
+            # Pinned batches: async copies overlap with queued GPU work
+            mel = mel.to(device, non_blocking=True)       # (B, 128, mel_frames)
+            audio = audio.to(device, non_blocking=True)   # (B, 1, segment_size)
 
-            # ---- Discriminator step ----
-            optim_d.zero_grad()
-            with torch.no_grad():
-                audio_fake = generator(mel)
+            # One generator forward per step: detached for D, reused for G
+            with torch.amp.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                audio_fake = train_gen(mel)
             # Trim to match lengths
             min_len = min(audio.shape[-1], audio_fake.shape[-1])
             audio_t = audio[..., :min_len]
             audio_f = audio_fake[..., :min_len]
 
-            mpd_real, _ = mpd(audio_t)
-            mpd_fake, _ = mpd(audio_f)
-            msd_real, _ = msd(audio_t)
-            msd_fake, _ = msd(audio_f)
+            # ---- Discriminator step ----
+            optim_d.zero_grad(set_to_none=True)
+            with torch.amp.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                mpd_real, mpd_fake, _, _ = discriminate(train_mpd, audio_t, audio_f.detach())
+                msd_real, msd_fake, _, _ = discriminate(train_msd, audio_t, audio_f.detach())
 
-            loss_d = discriminator_loss(mpd_real, mpd_fake) + discriminator_loss(msd_real, msd_fake)
+                loss_d = discriminator_loss(mpd_real, mpd_fake) + discriminator_loss(msd_real, msd_fake)
 
-            loss_d.backward()
-            optim_d.step()
+            scaler_d.scale(loss_d).backward()
+            scaler_d.step(optim_d)
+            scaler_d.update()
 
             # ---- Generator step ----
-            optim_g.zero_grad()
-            audio_fake = generator(mel)
-            min_len = min(audio.shape[-1], audio_fake.shape[-1])
-            audio_t = audio[..., :min_len]
-            audio_f = audio_fake[..., :min_len]
-
-            mpd_real, mpd_real_fmap = mpd(audio_t)
-            mpd_fake, mpd_fake_fmap = mpd(audio_f)
-            msd_real, msd_real_fmap = msd(audio_t)
-            msd_fake, msd_fake_fmap = msd(audio_f)
+            optim_g.zero_grad(set_to_none=True)
+            with torch.amp.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                # Real fmaps are recomputed: D was just updated
+                _, mpd_fake, mpd_real_fmap, mpd_fake_fmap = discriminate(train_mpd, audio_t, audio_f)
+                _, msd_fake, msd_real_fmap, msd_fake_fmap = discriminate(train_msd, audio_t, audio_f)
 
-            loss_gen = generator_adversarial_loss(mpd_fake) + generator_adversarial_loss(msd_fake)
-            loss_fm = feature_matching_loss(mpd_real_fmap, mpd_fake_fmap) + feature_matching_loss(msd_real_fmap, msd_fake_fmap)
-            loss_mel = mel_spectrogram_loss(audio_t, audio_f)
+                loss_gen = generator_adversarial_loss(mpd_fake) + generator_adversarial_loss(msd_fake)
+                loss_fm = feature_matching_loss(mpd_real_fmap, mpd_fake_fmap) + feature_matching_loss(msd_real_fmap, msd_fake_fmap)
+                loss_mel = mel_spectrogram_loss(audio_t, audio_f)
 
-            loss_g = loss_gen + 2.0 * loss_fm + 45.0 * loss_mel
+                loss_g = loss_gen + 2.0 * loss_fm + 45.0 * loss_mel
 
-            loss_g.backward()
-            optim_g.step()
+            scaler_g.scale(loss_g).backward()
+            scaler_g.step(optim_g)
+            scaler_g.update()
 
             global_step += 1
             pbar.set_postfix(loss_g=f"{loss_g.item():.3f}", loss_d=f"{loss_d.item():.3f}")
@@ -294,39 +435,44 @@ def train(args: argparse.Namespace) -> None:
         sched_g.step()
         sched_d.step()
 
-        # Save checkpoint
-        if (epoch + 1) % args.checkpoint_every == 0 or epoch == args.epochs - 1:
-            ckpt_path = checkpoint_dir / f"vocoder_epoch_{epoch+1}.pt"
-            torch.save({
-                "generator": generator.state_dict(),
-                "mpd": mpd.state_dict(),
-                "msd": msd.state_dict(),
-                "optim_g": optim_g.state_dict(),
-                "optim_d": optim_d.state_dict(),
-                "sched_g": sched_g.state_dict(),
-                "sched_d": sched_d.state_dict(),
-                "epoch": epoch,
-            }, ckpt_path)
-            print(f"Saved {ckpt_path}")
-
-        # Always save latest for resume
-        torch.save({
+        # Snapshot to CPU on this thread, serialize on the checkpoint thread
+        state = to_cpu({
             "generator": generator.state_dict(),
+            "generator_type": args.generator,
+            "generator_kwargs": generator_kwargs,
             "mpd": mpd.state_dict(),
             "msd": msd.state_dict(),
             "optim_g": optim_g.state_dict(),
             "optim_d": optim_d.state_dict(),
             "sched_g": sched_g.state_dict(),
             "sched_d": sched_d.state_dict(),
+            "scaler_g": scaler_g.state_dict(),
+            "scaler_d": scaler_d.state_dict(),
             "epoch": epoch,
-        }, checkpoint_dir / "vocoder_latest.pt")
+        })
+        if device.type == "cuda":
+            torch.cuda.synchronize()  # non_blocking copies must land first
 
+        # Always save latest for resume
+        paths = [checkpoint_dir / "vocoder_latest.pt"]
+        if (epoch + 1) % args.checkpoint_every == 0 or epoch == args.epochs - 1:
+            paths.append(checkpoint_dir / f"vocoder_epoch_{epoch+1}.pt")
+        if pending_save is not None:
+            pending_save.result()  # at most one write in flight; re-raises errors
+        pending_save = ckpt_pool.submit(save_checkpoint, state, paths)
+
+    if pending_save is not None:
+        pending_save.result()
+    ckpt_pool.shutdown()
     writer.close()
     print("Training complete.")
 
-    # Save inference-ready checkpoint
+    # Save inference-ready checkpoint: generator only, no discriminator,
+    # optimizer or scaler state, so deployments skip the training-only weights
     torch.save({
         "generator_state_dict": generator.state_dict(),
+        "generator_type": args.generator,
+        "generator_kwargs": generator_kwargs,
     }, checkpoint_dir / "vocoder.pt")
     print(f"Saved inference checkpoint: {checkpoint_dir / 'vocoder.pt'}")
 
@@ -337,10 +483,17 @@ def main() -> None:
     parser.add_argument("--processed-dir", type=str, default="data/processed")
     parser.add_argument("--batch-size", type=int, default=8)
     parser.add_argument("--segment-size", type=int, default=8192)
+    parser.add_argument("--generator", choices=sorted(GENERATORS), default="hifigan",
+                        help="hifigan: transposed-conv upsampling; istft: iSTFT output head")
+    parser.add_argument("--depthwise", action="store_true",
+                        help="Depthwise-separable resblock convs (fewer weights and FLOPs)")
     parser.add_argument("--lr", type=float, default=2e-4)
     parser.add_argument("--epochs", type=int, default=50)
     parser.add_argument("--num-workers", type=int, default=2)
     parser.add_argument("--use-amp", action="store_true", default=True)
+    parser.add_argument("--no-amp", dest="use_amp", action="store_false")
+    parser.add_argument("--compile", action="store_true", default=True)
+    parser.add_argument("--no-compile", dest="compile", action="store_false")
     parser.add_argument("--checkpoint-dir", type=str, default="checkpoints")
     parser.add_argument("--checkpoint-every", type=int, default=10)
     parser.add_argument("--log-dir", type=str, default="runs/vocoder")
@@ -3,7 +3,7 @@ from pathlib import Path
 
 # Define Image & Dependencies
 image = modal.Image.debian_slim(python_version="3.11").pip_install(
-    "torch", "torchaudio", "huggingface_hub", "scipy", "numpy"
+    "torch", "torchaudio", "huggingface_hub", "numpy"
 )
 
 app = modal.App("kick-generator-app")
@@ -49,9 +49,14 @@ class KickGenerator:
         # (Make sure generate.py doesn't run main() on import!)
         from inference.generate import (
             DDIMSampler,
+            build_kw_to_idx,
             parse_prompt,
             log_mel_to_mel,
+            apply_fade_out,
             griffin_lim_synthesis,
+            load_checkpoint,
+            normalize_peak,
+            write_wav_int16,
         )
 
         # Save helpers for later use
@@ -59,16 +64,25 @@ class KickGenerator:
         self.DDIMSampler = DDIMSampler
         self.log_mel_to_mel = log_mel_to_mel
         self.griffin_lim_synthesis = griffin_lim_synthesis
+        self.apply_fade_out = apply_fade_out
+        self.normalize_peak = normalize_peak
+        self.write_wav_int16 = write_wav_int16
 
         self.device = torch.device("cuda")
+        # Every request runs the same shapes: autotune conv algorithms once
+        # (during warm-up) and allow TF32 for fp32 matmuls
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision("high")
 
         # --- C. Load Diffusion Model ---
         print("Loading Diffusion...")
         diff_path = os.path.join(self.repo_dir, "weights/diffusion_step_100000.pt")
-        diff_ckpt = torch.load(diff_path, map_location=self.device, weights_only=False)
+        # Safe tensors-only, memory-mapped load (old config dataclasses allowlisted)
+        diff_ckpt = load_checkpoint(diff_path, self.device)
 
         self.diff_cfg = diff_ckpt["config"]
         self.vocab = diff_ckpt["vocab"]
+        self.kw_to_idx = build_kw_to_idx(self.vocab)
 
         self.model = LatentUNet(
             latent_dim=self.diff_cfg.latent_dim,
@@ -77,6 +91,8 @@ class KickGenerator:
         ).to(self.device)
         self.model.load_state_dict(diff_ckpt["ema_state_dict"])
         self.model.eval()
+        # Weights are loaded first so state_dict keys carry no _orig_mod prefix
+        self.model = torch.compile(self.model, mode="reduce-overhead", dynamic=False)
 
         # --- D. Load Text Encoder ---
         self.text_enc = KeywordEncoder(
@@ -94,28 +110,67 @@ class KickGenerator:
         # --- E. Load VAE ---
         print("Loading VAE...")
         vae_path = os.path.join(self.repo_dir, "weights/vae_epoch_100.pt")
-        vae_ckpt = torch.load(vae_path, map_location=self.device, weights_only=False)
+        vae_ckpt = load_checkpoint(vae_path, self.device)
         self.vae = KickVAE(latent_dim=self.diff_cfg.latent_dim).to(self.device)
         self.vae.load_state_dict(vae_ckpt["model_state_dict"])
         self.vae.eval()
+        # Only decode() runs at inference
+        self.vae.decoder = torch.compile(
+            self.vae.decoder, mode="reduce-overhead", dynamic=False
+        )
 
         # --- F. Load Vocoder (Optional) ---
         print("Loading Vocoder...")
-        voc_path = os.path.join(self.repo_dir, "weights/vocoder_epoch_50.pt")
-        if os.path.exists(voc_path):
-            from models.vocoder import HiFiGANGenerator
+        # Prefer the generator-only export; the full training checkpoint
+        # (discriminator/optimizer state too) is the fallback
+        voc_path = next(
+            (
+                path
+                for path in (
+                    os.path.join(self.repo_dir, "weights/vocoder.pt"),
+                    os.path.join(self.repo_dir, "weights/vocoder_epoch_50.pt"),
+                )
+                if os.path.exists(path)
+            ),
+            None,
+        )
+        if voc_path is not None:
+            print(f"Using {os.path.basename(voc_path)}")
+            from models.precision import native_bf16
+            from models.vocoder import GENERATORS, freeze_for_inference
 
-            self.vocoder = HiFiGANGenerator(in_channels=128).to(self.device)
-            voc_ckpt = torch.load(
-                voc_path, map_location=self.device, weights_only=False
+            voc_ckpt = load_checkpoint(voc_path, self.device)
+            generator_cls = GENERATORS[voc_ckpt.get("generator_type", "hifigan")]
+            self.vocoder = generator_cls(
+                in_channels=128, **voc_ckpt.get("generator_kwargs", {})
+            ).to(self.device)
+            # vocoder.pt stores "generator_state_dict", training checkpoints "generator"
+            key = "generator" if "generator" in voc_ckpt else "generator_state_dict"
+            self.vocoder.load_state_dict(voc_ckpt[key])
+            self.vocoder_bf16 = native_bf16(self.device)
+            freeze_for_inference(
+                self.vocoder, torch.bfloat16 if self.vocoder_bf16 else None
+            )
+            # reduce-overhead captures the forward as a CUDA graph per input
+            # shape. Weight norm is folded first, so the graph holds plain
+            # weights, and every request passes the same (128, T) mel, so the
+            # single graph captured during warm-up is replayed each time
+            self.vocoder = torch.compile(
+                self.vocoder, mode="reduce-overhead", dynamic=False
             )
-            self.vocoder.load_state_dict(voc_ckpt["generator"])
-            self.vocoder.eval()
-            self.vocoder.remove_weight_norm()
         else:
             print("Vocoder not found, using Griffin-Lim")
             self.vocoder = None
 
+        # --- G. Warm Up ---
+        # Trigger compilation and CUDA graph capture during boot rather than
+        # on the first user request. The sampler runs the U-Net at batch 2
+        # with guidance (cond + uncond) and batch 1 without (cfg_scale <= 1),
+        # so capture one graph for each shape; later steps just replay them.
+        print("Warming up...")
+        for warmup_cfg in (3.0, 1.0):
+            self._render_wav("hit house", warmup_cfg, 50)
+
     @modal.method()
     def generate_kick(
         self, prompt: str = "hit house", cfg_scale: float = 3.0, steps: int = 50
@@ -123,17 +178,58 @@ class KickGenerator:
         """
         This runs for each generation. It reuses the models loaded in setup().
         """
+        return self._render_wav(prompt, cfg_scale, steps)
+
+    @modal.method()
+    def generate_kick_to_url(
+        self,
+        prompt: str,
+        upload_url: str,
+        cfg_scale: float = 3.0,
+        steps: int = 50,
+    ) -> dict:
+        """
+        Generate a kick and PUT it straight to a presigned storage URL,
+        so the WAV bytes never pass through the Django backend.
+        Returns a small ack instead of the audio.
+        """
+        import time
+        import urllib.request
+
+        wav_bytes = self._render_wav(prompt, cfg_scale, steps)
+
+        attempts = 3
+        for attempt in range(attempts):
+            try:
+                req = urllib.request.Request(
+                    upload_url,
+                    data=wav_bytes,
+                    method="PUT",
+                    headers={"content-type": "audio/wav"},
+                )
+                with urllib.request.urlopen(req, timeout=30):
+                    pass
+                break
+            except Exception:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(2**attempt)
+
+        return {"bytes": len(wav_bytes)}
+
+    def _render_wav(self, prompt: str, cfg_scale: float, steps: int) -> bytes:
+        """Run the full pipeline and return the encoded WAV bytes."""
         import torch
         import io
-        import scipy.io.wavfile
-        import numpy as np
 
         # 1. Parse Prompt
-        token_ids = self.parse_prompt(prompt, self.vocab)
+        token_ids = self.parse_prompt(prompt, self.kw_to_idx)
 
         # 2. Get Embeddings
-        cond = self.text_enc([token_ids], self.device)
-        uncond = self.text_enc([[]], self.device)
+        # Prompt and null (CFG) embeddings in one encoder call; the sampler
+        # then runs cond + uncond as a single batch-2 U-Net forward per step
+        with torch.no_grad():
+            cond, uncond = self.text_enc([token_ids, []], self.device).chunk(2, dim=0)
 
         # 3. Sample (DDIM)
         sampler = self.DDIMSampler(self.scheduler, num_steps=steps)
@@ -147,13 +243,16 @@ class KickGenerator:
         )
 
         # 4. Decode VAE
-        with torch.no_grad():
+        with torch.no_grad(), torch.autocast(device_type="cuda", dtype=torch.float16):
             log_mel = self.vae.decode(latent)
-            log_mel_2d = log_mel.squeeze(0)
+        log_mel_2d = log_mel.float().squeeze(0)
 
         # 5. Vocode
         if self.vocoder:
-            with torch.no_grad():
+            # bf16 only where it is native (Ampere+); the T4 stays fp32
+            with torch.no_grad(), torch.autocast(
+                device_type="cuda", dtype=torch.bfloat16, enabled=self.vocoder_bf16,
+            ):
                 waveform = self.vocoder(log_mel_2d)
                 waveform = waveform.squeeze(0)
         else:
@@ -171,28 +270,15 @@ class KickGenerator:
             pad = TARGET_SAMPLES - waveform.shape[-1]
             waveform = torch.nn.functional.pad(waveform, (0, pad))
 
-        # Normalize
-        peak = waveform.abs().max()
-        if peak > 0:
-            waveform = waveform * (0.95 / peak)
-
-        # Exponential fade-out (1.0s–1.75s) + silent tail (1.75s–2.0s).
-        # Exponential curve (power=3) drops fast then tapers, keeping OTT from
-        # re-amplifying the tail. 0.25s of hard silence lets OTT fully release.
-        fade_start = int(1.0 * SAMPLE_RATE)
-        fade_end = int(1.75 * SAMPLE_RATE)
-        fade_samples = fade_end - fade_start
-        if fade_start < waveform.shape[-1]:
-            fade = torch.linspace(1.0, 0.0, fade_samples, device=waveform.device) ** 3
-            waveform[..., fade_start:fade_end] *= fade
-            waveform[..., fade_end:] = 0.0
-
-        waveform_cpu = waveform.cpu()
-        audio_np = waveform_cpu.squeeze(0).numpy().astype(np.float32)
-
-        # Write to memory buffer
+        # Normalize (no host sync; the PCM copy below is the only one)
+        self.normalize_peak(waveform)
+
+        # Exponential fade-out (1.0s–1.75s) + silent tail (1.75s–2.0s)
+        self.apply_fade_out(waveform)
+
+        # Quantize to 16-bit PCM on the GPU, copy once, write to memory buffer
         buffer = io.BytesIO()
-        scipy.io.wavfile.write(buffer, 44100, audio_np)
+        self.write_wav_int16(buffer, waveform, SAMPLE_RATE)
         buffer.seek(0)
 
         return buffer.read()